@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+
+try:
+    import brotli
+except ImportError:
+    # Opcional: sin el paquete Brotli solo se generan las versiones .gz
+    brotli = None
+
+from registro import configurar_registro
+
+# ========== ARCHIVOS ESTÁTICOS CON HUELLA ==========
+# Copia los .css y .js de static/ en static/dist/ con el hash del contenido en
+# el nombre (style.css -> dist/style.1a2b3c4d5e.css), junto con sus versiones
+# comprimidas (.gz y, si está instalado Brotli, .br). Como el nombre cambia con
+# el contenido, el navegador puede guardarlos un año sin volver a preguntar.
+#
+# manifest.json relaciona cada archivo fuente con su versión en dist/; las
+# plantillas lo usan a través de asset_url() (app.py). Se construye en la
+# imagen de Docker y al arrancar gunicorn (gunicorn.conf.py); a mano:
+#     python assets.py
+
+log = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST = 'dist'
+MANIFIESTO = 'manifest.json'
+# Manifiesto de la construcción anterior: sus archivos se conservan
+MANIFIESTO_ANTERIOR = 'manifest.anterior.json'
+EXTENSIONES = ('.css', '.js')
+LARGO_HUELLA = 10
+
+# Extensión de cada codificación precomprimida, en orden de preferencia
+VARIANTES = (('br', '.br'), ('gzip', '.gz')) if brotli else (('gzip', '.gz'),)
+
+
+def _escribir(ruta, datos):
+    """Escribir en un temporal y renombrar: nunca se sirve un archivo a medias"""
+    directorio = os.path.dirname(ruta)
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(datos)
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _gzip(datos):
+    # mtime=0: el mismo contenido produce siempre el mismo .gz
+    return gzip.compress(datos, compresslevel=9, mtime=0)
+
+
+def _fuentes(static_dir):
+    """Rutas relativas (con /) de los archivos a publicar, fuera de dist/"""
+    for raiz, directorios, archivos in os.walk(static_dir):
+        if raiz == static_dir and DIST in directorios:
+            directorios.remove(DIST)
+        directorios.sort()
+        for nombre in sorted(archivos):
+            if nombre.endswith(EXTENSIONES):
+                ruta = os.path.join(raiz, nombre)
+                yield os.path.relpath(ruta, static_dir).replace(os.sep, '/')
+
+
+def nombre_con_huella(fuente, datos):
+    base, extension = os.path.splitext(fuente)
+    huella = hashlib.sha256(datos).hexdigest()[:LARGO_HUELLA]
+    return f"{base}.{huella}{extension}"
+
+
+def leer_manifiesto(static_dir=STATIC_DIR, nombre=MANIFIESTO):
+    """{fuente: archivo en dist/}, vacío si todavía no se construyó"""
+    try:
+        with open(os.path.join(static_dir, DIST, nombre), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def construir(static_dir=STATIC_DIR):
+    """Generar dist/ y su manifiesto; devuelve el manifiesto.
+
+    Solo se escriben los archivos que faltan, así volver a construir sin
+    cambios no toca nada. Se conservan los archivos de la construcción
+    anterior (las páginas ya abiertas todavía los piden) y se borra lo más viejo.
+    """
+    dist = os.path.join(static_dir, DIST)
+    anterior = leer_manifiesto(static_dir)
+    manifiesto = {}
+
+    for fuente in _fuentes(static_dir):
+        with open(os.path.join(static_dir, fuente), 'rb') as f:
+            datos = f.read()
+        destino = nombre_con_huella(fuente, datos)
+        manifiesto[fuente] = destino
+        ruta = os.path.join(dist, destino)
+        if not os.path.exists(ruta):
+            _escribir(ruta, datos)
+        if not os.path.exists(ruta + '.gz'):
+            _escribir(ruta + '.gz', _gzip(datos))
+        if brotli and not os.path.exists(ruta + '.br'):
+            _escribir(ruta + '.br', brotli.compress(datos, quality=11))
+
+    if manifiesto != anterior:
+        if anterior:
+            _escribir(os.path.join(dist, MANIFIESTO_ANTERIOR),
+                      json.dumps(anterior, indent=2, sort_keys=True).encode('utf-8'))
+        _escribir(os.path.join(dist, MANIFIESTO),
+                  json.dumps(manifiesto, indent=2, sort_keys=True).encode('utf-8'))
+        log.info("📦 Archivos estáticos: %s en %s%s", len(manifiesto), dist,
+                 '' if brotli else ' (sin Brotli, solo .gz)')
+    previo = leer_manifiesto(static_dir, MANIFIESTO_ANTERIOR)
+    _limpiar(dist, set(manifiesto.values()) | set(previo.values()))
+    return manifiesto
+
+
+def _limpiar(dist, vigentes):
+    """Borrar de dist/ los archivos que no están en ninguno de los dos manifiestos"""
+    conservar = {MANIFIESTO, MANIFIESTO_ANTERIOR}
+    for destino in vigentes:
+        conservar.update({destino, destino + '.gz', destino + '.br'})
+    for raiz, _, archivos in os.walk(dist):
+        for nombre in archivos:
+            if nombre.endswith('.tmp'):
+                # Puede ser la escritura en curso de otro proceso
+                continue
+            ruta = os.path.join(raiz, nombre)
+            if os.path.relpath(ruta, dist).replace(os.sep, '/') not in conservar:
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+
+
+def main():
+    configurar_registro(formato='texto')
+    try:
+        manifiesto = construir()
+    except OSError as e:
+        log.error("❌ No se pudieron generar los archivos estáticos: %s", e)
+        sys.exit(1)
+    for fuente, destino in sorted(manifiesto.items()):
+        log.info("   %s -> %s", fuente, destino)
+
+
+if __name__ == '__main__':
+    main()
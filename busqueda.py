@@ -0,0 +1,108 @@
+from markupsafe import Markup, escape
+
+# ========== BÚSQUEDA DE TEXTO EN MANTENIMIENTOS ==========
+# Mantenimientos.Busqueda es un tsvector generado con la configuración
+# 'spanish' (problema, diagnóstico y observaciones, con pesos A, B y C) con un
+# índice GIN, ver init-db.sql.
+#
+# La búsqueda es en dos pasos: candidatos_sql ordena por relevancia solo
+# los ids (paginación por clave sobre rango e id) y resultados_sql arma los
+# fragmentos resaltados de las filas de la página, que es la parte cara.
+# Con términos muy comunes se ordenan por relevancia las MAX_CANDIDATOS
+# coincidencias más recientes en lugar de todas: así una búsqueda sobre cientos
+# de miles de casos no calcula el rango de cada uno.
+
+MAX_CANDIDATOS = 5000
+MAX_TEXTO = 200
+
+# Marcas de ts_headline (caracteres de uso privado, no aparecen en el texto):
+# el fragmento se escapa y recién después se reemplazan por <mark>
+INICIO_MARCA = '\ue000'
+FIN_MARCA = '\ue001'
+OPCIONES_RESALTADO = (f'StartSel={INICIO_MARCA}, StopSel={FIN_MARCA}, MaxWords=30, MinWords=10, '
+                      f'MaxFragments=2, FragmentDelimiter=" … "')
+
+# modo -> tsquery a partir de un parámetro
+CONSULTAS = {
+    # Texto libre: "pantalla azul", "impresora -papel", "\"no enciende\"" (sintaxis de buscador)
+    'texto': "websearch_to_tsquery('spanish', %s)",
+    # Casos parecidos a otro mantenimiento: cualquiera de las palabras de su problema
+    'similar': """(
+        SELECT to_tsquery('simple', COALESCE(string_agg(quote_literal(t.lexeme), ' | '), ''))
+        FROM Mantenimientos s, unnest(ts_filter(s.Busqueda, '{a}')) t
+        WHERE s.IdMantenimiento = %s
+    )""",
+}
+
+
+def parse_texto(valor):
+    return (valor or '').strip()[:MAX_TEXTO]
+
+
+def candidatos_sql(modo):
+    """Consulta base (id y rango) de las coincidencias; un parámetro: el texto o el id"""
+    return f"""
+    SELECT k.id, k.rango
+    FROM (
+        SELECT c.IdMantenimiento as id,
+               round(ts_rank_cd(c.Busqueda, c.consulta)::numeric, 6) as rango
+        FROM (
+            SELECT m.IdMantenimiento, m.Busqueda, q.consulta
+            FROM Mantenimientos m, (SELECT {CONSULTAS[modo]}) AS q(consulta)
+            WHERE m.Busqueda @@ q.consulta
+            ORDER BY m.IdMantenimiento DESC
+            LIMIT {MAX_CANDIDATOS}
+        ) c
+    ) k
+    """
+
+
+def _resaltado_sql(columna):
+    return f"ts_headline('spanish', {columna}, q.consulta, '{OPCIONES_RESALTADO}')"
+
+
+def resultados_sql(modo):
+    """Datos y fragmentos resaltados de una lista de ids; parámetros: el texto o el id, y los ids"""
+    return f"""
+    SELECT m.IdMantenimiento as id,
+           TO_CHAR(m.Fecha_Inicio, 'YYYY-MM-DD') as fecha_inicio,
+           TO_CHAR(m.Fecha_Final, 'YYYY-MM-DD') as fecha_final,
+           {_resaltado_sql("COALESCE(m.Problema_Presentado, '')")} as problema,
+           CASE WHEN m.Diagnostico <> '' THEN {_resaltado_sql('m.Diagnostico')} END as diagnostico,
+           CASE WHEN m.Observaciones <> '' THEN {_resaltado_sql('m.Observaciones')} END as observaciones,
+           m.Compra as compra_id,
+           ac.NumeroSerie as numero_serie,
+           p.Nombre as producto_nombre,
+           u.Nombre as usuario_nombre,
+           ub.NombreEdificio as ubicacion_nombre
+    FROM Mantenimientos m
+    CROSS JOIN (SELECT {CONSULTAS[modo]}) AS q(consulta)
+    LEFT JOIN AsignadorCompra ac ON m.Compra = ac.IdAsignadorCompra
+    LEFT JOIN Productos p ON ac.Producto = p.IdProducto
+    LEFT JOIN Usuarios u ON ac.Comprado_Para = u.IdUsuario
+    LEFT JOIN Ubicaciones ub ON u.Ubicacion = ub.IdUbicacion
+    WHERE m.IdMantenimiento = ANY(%s)
+    """
+
+
+def resaltar(fragmento):
+    """HTML de un fragmento de ts_headline: texto escapado y coincidencias en <mark>"""
+    if fragmento is None:
+        return None
+    html = str(escape(fragmento))
+    return Markup(html.replace(INICIO_MARCA, '<mark>').replace(FIN_MARCA, '</mark>'))
+
+
+def armar_resultados(pagina, filas):
+    """Filas de resultados_sql en el orden de la página, con su rango y los fragmentos en HTML"""
+    por_id = {fila['id']: fila for fila in filas}
+    resultados = []
+    for candidato in pagina:
+        fila = por_id.get(candidato['id'])
+        if fila is None:
+            continue
+        fila = dict(fila, rango=candidato['rango'])
+        for campo in ('problema', 'diagnostico', 'observaciones'):
+            fila[campo] = resaltar(fila[campo])
+        resultados.append(fila)
+    return resultados
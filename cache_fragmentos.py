@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# ========== CACHÉ DE FRAGMENTOS RENDERIZADOS ==========
+# HTML ya renderizado de las tablas de los listados. La clave incluye la ruta,
+# el orden, los filtros, la página y las versiones de las tablas leídas
+# (Versiones_Tablas): cuando los datos cambian la clave es otra y las entradas
+# viejas simplemente dejan de usarse hasta que el LRU las desaloja.
+#
+# Cada proceso tiene un LRU en memoria limitado en bytes. Con
+# FRAGMENT_CACHE_DIR los fragmentos se escriben además en un directorio
+# compartido, así un worker aprovecha lo que renderizó otro.
+
+log = logging.getLogger(__name__)
+
+# Un fragmento mayor a esta fracción del límite no se guarda: desalojaría casi todo
+MAX_FRACCION_ENTRADA = 4
+# Cada cuántas escrituras se revisa el tamaño del directorio
+REVISAR_DIRECTORIO_CADA = 50
+
+
+def _env_mb(nombre, default):
+    try:
+        return int(float(os.getenv(nombre, default)) * 1024 * 1024)
+    except ValueError:
+        return int(default * 1024 * 1024)
+
+
+def clave_fragmento(*partes):
+    """Clave estable (hex) a partir de valores serializables en JSON"""
+    datos = json.dumps(partes, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(datos.encode()).hexdigest()
+
+
+class FragmentStore:
+    """Fragmentos en archivos de un directorio compartido entre procesos.
+
+    Se escriben en un temporal y se renombran (os.replace es atómico), así un
+    lector nunca ve un archivo a medias. Al pasar el límite se borran los de
+    acceso más antiguo.
+    """
+
+    def __init__(self, directorio, max_bytes):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._escrituras = 0
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.json")
+
+    def get(self, clave):
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as f:
+                datos = f.read()
+            # La fecha de acceso ordena el desalojo
+            os.utime(ruta)
+        except OSError:
+            return None
+        return datos
+
+    def put(self, clave, datos):
+        try:
+            fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(datos)
+            os.replace(temporal, self._ruta(clave))
+        except OSError as e:
+            log.warning("⚠️ No se pudo guardar el fragmento en %s: %s", self.directorio, e)
+            return
+        with self._lock:
+            self._escrituras += 1
+            revisar = self._escrituras % REVISAR_DIRECTORIO_CADA == 0
+        if revisar:
+            self.podar()
+
+    def podar(self):
+        """Borrar los archivos de acceso más antiguo hasta bajar al 80% del límite"""
+        archivos = []
+        total = 0
+        try:
+            with os.scandir(self.directorio) as entradas:
+                for entrada in entradas:
+                    if not entrada.name.endswith('.json'):
+                        continue
+                    try:
+                        info = entrada.stat()
+                    except OSError:
+                        continue
+                    archivos.append((info.st_mtime, info.st_size, entrada.path))
+                    total += info.st_size
+        except OSError:
+            return
+        if total <= self.max_bytes:
+            return
+        archivos.sort()
+        objetivo = self.max_bytes * 0.8
+        for _, tamano, ruta in archivos:
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+            except OSError:
+                pass
+
+
+class FragmentCache:
+    """LRU en memoria con límite en bytes y, opcionalmente, un FragmentStore detrás.
+
+    Los valores son diccionarios serializables en JSON (partes de HTML y
+    datos chicos que la plantilla muestra fuera del fragmento).
+    """
+
+    def __init__(self, max_bytes, store=None):
+        self.max_bytes = max_bytes
+        self.store = store
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._store_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _guardar_memoria(self, clave, valor, tamano):
+        if tamano > self.max_bytes // MAX_FRACCION_ENTRADA:
+            return
+        with self._lock:
+            anterior = self._entries.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entries[clave] = (valor, tamano)
+            self._bytes += tamano
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, liberado) = self._entries.popitem(last=False)
+                self._bytes -= liberado
+                self._evictions += 1
+
+    def get(self, clave):
+        """(valor, origen): origen es 'memoria' o 'archivo'; (None, None) si no está"""
+        with self._lock:
+            entrada = self._entries.get(clave)
+            if entrada is not None:
+                self._entries.move_to_end(clave)
+                self._hits += 1
+                return entrada[0], 'memoria'
+
+        if self.store is not None:
+            datos = self.store.get(clave)
+            if datos is not None:
+                try:
+                    valor = json.loads(datos)
+                except ValueError:
+                    valor = None
+                if valor is not None:
+                    self._guardar_memoria(clave, valor, len(datos))
+                    with self._lock:
+                        self._store_hits += 1
+                    return valor, 'archivo'
+
+        with self._lock:
+            self._misses += 1
+        return None, None
+
+    def put(self, clave, valor):
+        datos = json.dumps(valor, ensure_ascii=False, separators=(',', ':')).encode()
+        self._guardar_memoria(clave, valor, len(datos))
+        if self.store is not None:
+            self.store.put(clave, datos)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'store_hits': self._store_hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'directory': self.store.directorio if self.store else None
+            }
+
+
+_cache = None
+_pid = None
+_lock = threading.Lock()
+
+
+def get_fragment_cache():
+    """Caché del proceso actual, o None si FRAGMENT_CACHE_MB es 0.
+
+    FRAGMENT_CACHE_MB (64) limita la memoria de cada proceso;
+    FRAGMENT_CACHE_DIR activa el directorio compartido, limitado por
+    FRAGMENT_CACHE_DIR_MB (512).
+    """
+    global _cache, _pid
+    with _lock:
+        if _pid != os.getpid():
+            _pid = os.getpid()
+            max_bytes = _env_mb('FRAGMENT_CACHE_MB', 64)
+            _cache = None
+            if max_bytes > 0:
+                store = None
+                directorio = os.getenv('FRAGMENT_CACHE_DIR', '').strip()
+                if directorio:
+                    try:
+                        store = FragmentStore(directorio, _env_mb('FRAGMENT_CACHE_DIR_MB', 512))
+                    except OSError as e:
+                        log.warning("⚠️ Directorio de fragmentos %s no disponible: %s", directorio, e)
+                _cache = FragmentCache(max_bytes, store)
+        return _cache
@@ -0,0 +1,181 @@
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2
+
+# ========== CACHÉ DE DATOS DE REFERENCIA ==========
+# Listas casi estáticas (categorías, proveedores, ubicaciones, usuarios,
+# productos) que los formularios y modales necesitan en cada página.
+#
+# Cada entrada guarda la versión de las tablas de las que depende. Escribir en
+# una tabla incrementa su versión (invalidate) y las entradas que dependen de
+# ella dejan de ser válidas sin tener que buscarlas ni borrarlas. Con un canal
+# LISTEN/NOTIFY, la invalidación llega también a los demás procesos.
+
+log = logging.getLogger(__name__)
+
+
+class ReferenceCache:
+    """Caché en memoria del proceso con entradas versionadas por tabla"""
+
+    def __init__(self, ttl=None):
+        self.ttl = float(ttl if ttl is not None else os.getenv('REFERENCE_CACHE_TTL', 300))
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def _versiones(self, tablas):
+        return tuple(self._versions.get(t, 0) for t in tablas)
+
+    def versions(self):
+        """Copia de las versiones actuales de todas las tablas"""
+        with self._lock:
+            return dict(self._versions)
+
+    def get(self, nombre, tablas, loader, vigente_desde=None):
+        """Valor de la entrada nombre; si falta o quedó vieja se recarga con loader().
+
+        Lo cargado solo se guarda si las versiones de sus tablas no cambiaron
+        desde antes de cargar: si alguien invalida mientras loader() consulta,
+        el valor se devuelve pero no se guarda. Si loader() lee de una foto que
+        empezó antes, vigente_desde() devuelve las versiones (de versions())
+        leídas al empezar esa foto, o None si lo cargado no debe guardarse.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            versiones = self._versiones(tablas)
+            entrada = self._entries.get(nombre)
+            if (entrada and entrada[0] == versiones
+                    and (self.ttl <= 0 or ahora - entrada[1] < self.ttl)):
+                self._hits += 1
+                return entrada[2]
+            self._misses += 1
+
+        valor = loader()
+        if valor is None:
+            # No guardar errores de consulta
+            return None
+        if vigente_desde is not None:
+            desde = vigente_desde()
+            if desde is None:
+                return valor
+            versiones = tuple(desde.get(t, 0) for t in tablas)
+        with self._lock:
+            if self._versiones(tablas) == versiones:
+                self._entries[nombre] = (versiones, ahora, valor)
+        return valor
+
+    def invalidate(self, *tablas):
+        """Marcar como modificadas las tablas (en minúsculas)"""
+        with self._lock:
+            for tabla in tablas:
+                self._versions[tabla] = self._versions.get(tabla, 0) + 1
+            self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'invalidations': self._invalidations,
+                'ttl': self.ttl,
+                'versions': dict(self._versions)
+            }
+
+
+class NotifyListener:
+    """Hilo que escucha un canal de PostgreSQL e invalida la caché con cada aviso.
+
+    El payload de cada NOTIFY es el nombre de la tabla modificada. Si la
+    conexión se pierde se vacía la caché (pudieron perderse avisos) y se
+    reintenta.
+    """
+
+    def __init__(self, cache, dsn, channel, reconnect_delay=5):
+        self.cache = cache
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"listen-{self.channel}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                log.info("👂 Escuchando invalidaciones de caché en el canal '%s'", self.channel)
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    tablas = set()
+                    while conn.notifies:
+                        tablas.add(conn.notifies.pop(0).payload)
+                    if tablas:
+                        self.cache.invalidate(*tablas)
+            except Exception as e:
+                log.warning("⚠️ Canal de invalidación '%s' desconectado: %s", self.channel, e)
+                self.cache.clear()
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+_cache = None
+_listener = None
+_pid = None
+_lock = threading.Lock()
+
+
+def get_reference_cache(dsn=None):
+    """Caché del proceso actual.
+
+    Si REFERENCE_CACHE_CHANNEL tiene un nombre de canal y se indica dsn, la
+    primera llamada de cada proceso arranca el hilo que escucha ese canal
+    (los hilos no sobreviven a un fork, por eso se verifica el pid).
+    """
+    global _cache, _listener, _pid
+    with _lock:
+        if _cache is None or _pid != os.getpid():
+            _cache = ReferenceCache()
+            _listener = None
+            _pid = os.getpid()
+        channel = reference_cache_channel()
+        if channel and dsn and _listener is None:
+            _listener = NotifyListener(_cache, dsn, channel)
+            _listener.start()
+        return _cache
+
+
+def reference_cache_channel():
+    return os.getenv('REFERENCE_CACHE_CHANNEL', '').strip()
@@ -0,0 +1,281 @@
+from datetime import date
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+# ========== ALTA DE COMPRAS EN LOTE ==========
+# Todas las filas del formulario se validan primero con una consulta por tabla
+# referenciada (no una por fila) y las válidas se insertan con INSERT de varias
+# filas dentro de la transacción de la petición. Si aun así el lote falla (p. ej.
+# un registro borrado entre la validación y el INSERT), se reintenta fila por
+# fila con un SAVEPOINT cada una para reportar exactamente cuál falló.
+#
+# Un vínculo con la compra padre que no se puede crear no impide guardar la
+# compra: se guarda sin vincular y se avisa, como en el alta de a una fila.
+# En modo "todo o nada" ese vínculo rechazado es un error de la fila y cancela
+# el lote.
+
+
+class FilaCompra:
+    """Una fila del formulario de compras, ya normalizada"""
+
+    def __init__(self, numero, fecha, producto, proveedor, fin_garantia=None,
+                 usuario=None, serie='', padre=None):
+        self.numero = numero
+        self.fecha = fecha
+        self.producto = producto
+        self.proveedor = proveedor
+        self.fin_garantia = fin_garantia
+        self.usuario = usuario
+        self.serie = serie
+        self.padre = padre
+        self.id = None
+        self.error = None
+        # Motivo por el que se rechazó el vínculo con el padre
+        self.motivo_sin_padre = None
+
+    @property
+    def aviso(self):
+        if self.motivo_sin_padre:
+            return f"Compra guardada sin vincular: {self.motivo_sin_padre}"
+        return None
+
+    def sin_padre(self, motivo):
+        self.padre = None
+        self.motivo_sin_padre = motivo
+
+    def valores(self):
+        return (self.id, self.fecha, self.producto, self.proveedor,
+                self.fin_garantia, self.usuario, self.serie)
+
+
+class ResultadoLote:
+    """Resumen del alta: filas insertadas, relaciones creadas y errores por fila"""
+
+    def __init__(self, filas, insertadas=0, relaciones=0, error_general=None):
+        self.filas = filas
+        self.insertadas = insertadas
+        self.relaciones = relaciones
+        self.error_general = error_general
+
+    @property
+    def errores(self):
+        return [f"Fila {f.numero}: {f.error}" for f in self.filas if f.error]
+
+    @property
+    def avisos(self):
+        return [f"Fila {f.numero}: {f.aviso}" for f in self.filas if f.aviso and f.id]
+
+
+def _valor(lista, i):
+    return lista[i].strip() if i < len(lista) and lista[i] else ''
+
+
+def _fecha(texto):
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        return None
+
+
+def _entero(texto):
+    try:
+        return int(texto)
+    except ValueError:
+        return None
+
+
+def leer_filas(form):
+    """Convertir los arreglos fecha_compra[], producto[], ... del formulario en FilaCompra.
+
+    Los errores de formato quedan anotados en cada fila; no se consulta la BD.
+    """
+    fechas = form.getlist('fecha_compra[]')
+    productos = form.getlist('producto[]')
+    proveedores = form.getlist('proveedor[]')
+    fin_garantias = form.getlist('fin_garantia[]')
+    usuarios = form.getlist('comprado_para[]')
+    series = form.getlist('numero_serie[]')
+    productos_padre = form.getlist('producto_padre[]')
+
+    filas = []
+    for i in range(len(fechas)):
+        fecha = _valor(fechas, i)
+        producto = _valor(productos, i)
+        proveedor = _valor(proveedores, i)
+        fin_garantia = _valor(fin_garantias, i)
+        usuario = _valor(usuarios, i)
+        padre = _valor(productos_padre, i)
+
+        fila = FilaCompra(i + 1, _fecha(fecha), _entero(producto), _entero(proveedor),
+                          fin_garantia=_fecha(fin_garantia) if fin_garantia else None,
+                          usuario=_entero(usuario) if usuario else None,
+                          serie=_valor(series, i),
+                          padre=_entero(padre) if padre else None)
+        if padre and fila.padre is None:
+            fila.sin_padre(f"compra padre inválida: {padre}")
+
+        if not fecha or not producto or not proveedor:
+            fila.error = "Faltan campos requeridos (Fecha, Producto o Proveedor)"
+        elif fila.fecha is None:
+            fila.error = f"Fecha de compra inválida: {fecha}"
+        elif fin_garantia and fila.fin_garantia is None:
+            fila.error = f"Fin de garantía inválido: {fin_garantia}"
+        elif fila.producto is None or fila.proveedor is None:
+            fila.error = "Producto o proveedor inválido"
+        elif usuario and fila.usuario is None:
+            fila.error = "Usuario inválido"
+        filas.append(fila)
+    return filas
+
+
+def _existentes(cursor, sql, ids):
+    if not ids:
+        return {}
+    cursor.execute(sql, (list(ids),))
+    return {fila[0]: fila[1:] for fila in cursor.fetchall()}
+
+
+def validar_filas(cursor, filas):
+    """Comprobar contra la BD las referencias de todas las filas pendientes.
+
+    Aplica las mismas reglas que agregar_relacion para el vínculo con la compra
+    padre: debe existir, ser de un producto "Madre" y del mismo usuario. Una
+    compra nueva no puede cerrar un ciclo porque nadie cuelga todavía de ella.
+    Si el vínculo no cumple las reglas la fila sigue siendo válida, sin padre.
+    """
+    pendientes = [f for f in filas if not f.error]
+    productos = _existentes(
+        cursor,
+        "SELECT IdProducto FROM Productos WHERE IdProducto = ANY(%s)",
+        {f.producto for f in pendientes})
+    proveedores = _existentes(
+        cursor,
+        "SELECT IdProveedor FROM Proveedores WHERE IdProveedor = ANY(%s)",
+        {f.proveedor for f in pendientes})
+    usuarios = _existentes(
+        cursor,
+        "SELECT IdUsuario FROM Usuarios WHERE IdUsuario = ANY(%s)",
+        {f.usuario for f in pendientes if f.usuario})
+    padres = _existentes(
+        cursor,
+        """SELECT ac.IdAsignadorCompra, ac.Comprado_Para, p.Es_Producto_Madre
+           FROM AsignadorCompra ac
+           LEFT JOIN Productos p ON ac.Producto = p.IdProducto
+           WHERE ac.IdAsignadorCompra = ANY(%s)""",
+        {f.padre for f in pendientes if f.padre})
+
+    for fila in pendientes:
+        if fila.producto not in productos:
+            fila.error = f"El producto {fila.producto} no existe"
+        elif fila.proveedor not in proveedores:
+            fila.error = f"El proveedor {fila.proveedor} no existe"
+        elif fila.usuario and fila.usuario not in usuarios:
+            fila.error = f"El usuario {fila.usuario} no existe"
+        elif fila.padre:
+            if fila.padre not in padres:
+                fila.sin_padre(f"la compra padre {fila.padre} no existe")
+                continue
+            usuario_padre, padre_es_madre = padres[fila.padre]
+            if not fila.usuario or not usuario_padre:
+                fila.sin_padre("para vincular a un padre ambas compras deben tener un usuario asignado")
+            elif fila.usuario != usuario_padre:
+                fila.sin_padre("solo puede vincular compras del mismo usuario")
+            elif not padre_es_madre:
+                fila.sin_padre('la compra padre debe ser de un producto tipo "Madre" (ej: computadora)')
+    return filas
+
+
+def _reservar_ids(cursor, cantidad):
+    """Tomar de la secuencia los IDs de las compras nuevas para poder
+    armar las relaciones sin depender del orden de RETURNING"""
+    cursor.execute(
+        """SELECT nextval(pg_get_serial_sequence('asignadorcompra', 'idasignadorcompra'))
+           FROM generate_series(1, %s)""",
+        (cantidad,))
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+INSERT_COMPRAS = """INSERT INTO AsignadorCompra
+    (IdAsignadorCompra, Fecha_Compra, Producto, Proveedor, Fin_Garantia, Comprado_Para, NumeroSerie)
+    VALUES %s"""
+
+INSERT_RELACIONES = "INSERT INTO Relacion_Entre_Compras (IdCompra_Madre, IdSub_Compra) VALUES %s"
+
+
+def _mensaje(error):
+    return error.diag.message_primary or str(error).strip()
+
+
+def _insertar_lote(cursor, filas):
+    for fila, nuevo_id in zip(filas, _reservar_ids(cursor, len(filas))):
+        fila.id = nuevo_id
+    execute_values(cursor, INSERT_COMPRAS, [f.valores() for f in filas], page_size=len(filas))
+    vinculos = [(f.padre, f.id) for f in filas if f.padre]
+    if vinculos:
+        execute_values(cursor, INSERT_RELACIONES, vinculos, page_size=len(vinculos))
+    return len(vinculos)
+
+
+def _insertar_por_fila(cursor, filas):
+    """Camino lento: cada fila en su propio SAVEPOINT para aislar las que fallan.
+
+    Si falla solo el vínculo con el padre, la compra queda guardada sin vincular.
+    """
+    relaciones = 0
+    for fila in filas:
+        cursor.execute("SAVEPOINT lote_fila")
+        try:
+            fila.id = _reservar_ids(cursor, 1)[0]
+            execute_values(cursor, INSERT_COMPRAS, [fila.valores()])
+            cursor.execute("RELEASE SAVEPOINT lote_fila")
+        except psycopg2.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT lote_fila")
+            fila.id = None
+            fila.error = f"Error - {_mensaje(e)}"
+            continue
+        if fila.padre:
+            cursor.execute("SAVEPOINT lote_vinculo")
+            try:
+                execute_values(cursor, INSERT_RELACIONES, [(fila.padre, fila.id)])
+                cursor.execute("RELEASE SAVEPOINT lote_vinculo")
+                relaciones += 1
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT lote_vinculo")
+                fila.sin_padre(_mensaje(e))
+    return relaciones
+
+
+def insertar_compras(cursor, filas, todo_o_nada=False):
+    """Validar e insertar las filas en la transacción abierta del cursor.
+
+    Con todo_o_nada, cualquier fila con error (incluido un vínculo con el padre
+    rechazado) cancela el lote completo y no se inserta nada; si no, las filas
+    válidas se guardan y las demás se reportan.
+    """
+    validar_filas(cursor, filas)
+    if todo_o_nada:
+        for fila in filas:
+            if fila.motivo_sin_padre and not fila.error:
+                fila.error = f"Vínculo con la compra padre rechazado: {fila.motivo_sin_padre}"
+    validas = [f for f in filas if not f.error]
+    if not validas:
+        return ResultadoLote(filas)
+    if todo_o_nada and len(validas) != len(filas):
+        return ResultadoLote(filas, error_general="Hay filas con errores; no se guardó ninguna compra")
+
+    cursor.execute("SAVEPOINT lote_compras")
+    try:
+        relaciones = _insertar_lote(cursor, validas)
+        cursor.execute("RELEASE SAVEPOINT lote_compras")
+        return ResultadoLote(filas, insertadas=len(validas), relaciones=relaciones)
+    except psycopg2.Error as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT lote_compras")
+        for fila in validas:
+            fila.id = None
+        if todo_o_nada:
+            return ResultadoLote(filas, error_general=f"No se guardó ninguna compra: {_mensaje(e)}")
+
+    relaciones = _insertar_por_fila(cursor, validas)
+    insertadas = sum(1 for f in validas if f.id)
+    return ResultadoLote(filas, insertadas=insertadas, relaciones=relaciones)
@@ -0,0 +1,332 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+# ========== CONFIGURACIÓN ==========
+# Límites superiores (en segundos) de los buckets del histograma de espera
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _env_int(nombre, default):
+    try:
+        return int(os.getenv(nombre, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(nombre, default):
+    try:
+        return float(os.getenv(nombre, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """No se obtuvo una conexión libre dentro del tiempo de espera"""
+
+
+class ConnectionPool:
+    """Pool de conexiones thread-safe con límites min/max, expiración por
+    inactividad y verificación de salud al entregar una conexión.
+
+    Configuración por variables de entorno (se pueden sobreescribir por argumento):
+        DB_POOL_MIN                 conexiones que se mantienen abiertas (1)
+        DB_POOL_MAX                 máximo de conexiones abiertas (10)
+        DB_POOL_IDLE_TIMEOUT        segundos antes de cerrar una conexión ociosa (300)
+        DB_POOL_TIMEOUT             segundos máximos esperando una conexión libre (30)
+        DB_POOL_HEALTHCHECK         segundos de inactividad tras los cuales se
+                                    verifica la conexión con SELECT 1 (30)
+    """
+
+    def __init__(self, dsn=None, minconn=None, maxconn=None, idle_timeout=None,
+                 timeout=None, healthcheck_interval=None, **connect_kwargs):
+        self.dsn = dsn
+        self.connect_kwargs = connect_kwargs
+        self.minconn = minconn if minconn is not None else _env_int('DB_POOL_MIN', 1)
+        self.maxconn = maxconn if maxconn is not None else _env_int('DB_POOL_MAX', 10)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else _env_float('DB_POOL_IDLE_TIMEOUT', 300)
+        self.timeout = timeout if timeout is not None else _env_float('DB_POOL_TIMEOUT', 30)
+        self.healthcheck_interval = (healthcheck_interval if healthcheck_interval is not None
+                                     else _env_float('DB_POOL_HEALTHCHECK', 30))
+        self.minconn = max(0, min(self.minconn, self.maxconn))
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()       # (conn, ultimo_uso) -- la derecha es la más reciente
+        self._in_use = {}          # id(conn) -> conn
+        self._total = 0            # abiertas + en proceso de apertura
+        self._waiting = 0
+        self._closed = False
+        self._pid = os.getpid()
+
+        # Contadores para dimensionar el pool
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+
+        for _ in range(self.minconn):
+            with self._cond:
+                self._total += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+
+    # ---------- Apertura y cierre ----------
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, **self.connect_kwargs) if self.dsn else psycopg2.connect(**self.connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def _reap_idle(self, ahora):
+        """Retirar conexiones ociosas vencidas (se llama con el lock tomado)"""
+        vencidas = []
+        # Las más antiguas están a la izquierda
+        while self._idle and self._total - len(vencidas) > self.minconn:
+            conn, ultimo_uso = self._idle[0]
+            if ahora - ultimo_uso < self.idle_timeout:
+                break
+            self._idle.popleft()
+            vencidas.append(conn)
+        return vencidas
+
+    def _is_healthy(self, conn, ultimo_uso):
+        if conn.closed:
+            return False
+        if time.monotonic() - ultimo_uso < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ---------- Checkout / devolución ----------
+    def getconn(self, timeout=None):
+        """Obtener una conexión del pool, esperando si están todas en uso"""
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+        limite = inicio + timeout
+
+        while True:
+            conn = None
+            ultimo_uso = None
+            with self._cond:
+                self._waiting += 1
+                try:
+                    while True:
+                        # También después de cada espera: closeall() despierta
+                        # a los que esperan y no deben tomar una conexión nueva
+                        if self._closed:
+                            raise psycopg2.InterfaceError("El pool de conexiones está cerrado")
+                        vencidas = self._reap_idle(time.monotonic())
+                        if vencidas:
+                            self._total -= len(vencidas)
+                            self._discarded += len(vencidas)
+                            for vieja in vencidas:
+                                try:
+                                    vieja.close()
+                                except Exception:
+                                    pass
+                        if self._idle:
+                            conn, ultimo_uso = self._idle.pop()
+                            break
+                        if self._total < self.maxconn:
+                            self._total += 1
+                            break
+                        restante = limite - time.monotonic()
+                        if restante <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeoutError(
+                                f"No hay conexiones libres tras {timeout:.1f}s "
+                                f"(en uso: {len(self._in_use)}, máximo: {self.maxconn})"
+                            )
+                        self._cond.wait(restante)
+                finally:
+                    self._waiting -= 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, ultimo_uso):
+                self._discard(conn)
+                continue
+
+            espera = time.monotonic() - inicio
+            with self._cond:
+                self._in_use[id(conn)] = conn
+                self._checkouts += 1
+                self._record_wait(espera)
+            return conn
+
+    def putconn(self, conn, close=False):
+        """Devolver una conexión al pool. Se descarta si quedó en mal estado."""
+        with self._cond:
+            if self._in_use.pop(id(conn), None) is None:
+                raise psycopg2.InterfaceError("La conexión no pertenece a este pool")
+
+        if not close and not conn.closed:
+            estado = conn.info.transaction_status
+            if estado == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif estado != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    close = True
+
+        if close or conn.closed or self._closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager: obtiene una conexión y la devuelve al salir"""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except Exception:
+            self.putconn(conn, close=conn.closed != 0)
+            raise
+        else:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Cerrar todas las conexiones ociosas y rechazar nuevos checkouts"""
+        with self._cond:
+            self._closed = True
+            ociosas = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._total -= len(ociosas)
+            self._cond.notify_all()
+        for conn in ociosas:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    # ---------- Estadísticas ----------
+    def _record_wait(self, espera):
+        """Registrar un tiempo de espera en el histograma (con el lock tomado)"""
+        for i, limite in enumerate(WAIT_BUCKETS):
+            if espera <= limite:
+                self._wait_buckets[i] += 1
+                break
+        else:
+            self._wait_buckets[-1] += 1
+        self._wait_sum += espera
+        self._wait_max = max(self._wait_max, espera)
+
+    def stats(self):
+        """Fotografía del estado del pool para dimensionarlo"""
+        with self._cond:
+            acumulado = 0
+            histograma = {}
+            for limite, cantidad in zip(WAIT_BUCKETS + (float('inf'),), self._wait_buckets):
+                acumulado += cantidad
+                histograma['+Inf' if limite == float('inf') else str(limite)] = acumulado
+            return {
+                'min': self.minconn,
+                'max': self.maxconn,
+                'open': self._total,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded,
+                'wait_seconds': {
+                    'count': self._checkouts,
+                    'sum': round(self._wait_sum, 6),
+                    'max': round(self._wait_max, 6),
+                    'buckets': histograma,
+                },
+            }
+
+
+# ========== REGISTRO DE POOLS POR PROCESO ==========
+_pools = {}
+_pools_lock = threading.Lock()
+# Pools heredados de un proceso padre. Se conservan sin usar: si el recolector
+# liberara sus conexiones, psycopg2 enviaría el cierre por el socket que el
+# padre todavía usa y le cortaría la sesión.
+_heredados = []
+
+
+def get_pool(dsn=None, **connect_kwargs):
+    """Obtener (o crear) el pool para un destino de conexión.
+
+    Los pools se crean perezosamente y por proceso: un worker que hace fork
+    nunca reutiliza los sockets heredados del proceso padre.
+    """
+    clave = (dsn, tuple(sorted(connect_kwargs.items())))
+    pid = os.getpid()
+    with _pools_lock:
+        pool = _pools.get(clave)
+        if pool is None or pool._pid != pid:
+            if pool is not None:
+                _heredados.append(pool)
+            pool = ConnectionPool(dsn, **connect_kwargs)
+            _pools[clave] = pool
+        return pool
+
+
+def all_pools():
+    """Pools vivos del proceso actual"""
+    pid = os.getpid()
+    with _pools_lock:
+        return [pool for pool in _pools.values() if pool._pid == pid]
+
+
+def reset_after_fork():
+    """Llamar en el proceso hijo justo después de un fork (post_fork de gunicorn).
+
+    Aparta los pools del padre sin cerrarlos y renueva el lock, que pudo
+    copiarse tomado por un hilo que no existe en el hijo.
+    """
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    _heredados.extend(_pools.values())
+    _pools.clear()
+
+
+def close_all_pools():
+    """Cerrar las conexiones ociosas de los pools del proceso (al terminar un worker)"""
+    for pool in all_pools():
+        pool.closeall()
@@ -0,0 +1,216 @@
+import queue
+import re
+import threading
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+# ========== EXPORTACIÓN DE LISTADOS (CSV / XLSX) ==========
+# Ambos formatos se generan por partes para que la memoria usada no dependa
+# del tamaño de la tabla:
+#   - CSV: COPY (consulta) TO STDOUT en un hilo que deja bloques en una cola
+#     acotada; si el cliente lee lento, COPY espera (contrapresión).
+#   - XLSX: un ZIP escrito sobre la marcha (zipfile admite destinos sin seek)
+#     con la hoja en XML, alimentado desde un cursor del lado del servidor.
+
+CHUNK_SIZE = 64 * 1024
+MAX_CHUNKS_EN_COLA = 8
+
+_FIN = object()
+
+
+class ExportacionCancelada(Exception):
+    """El cliente cerró la descarga antes de terminar"""
+
+
+class _DestinoCola:
+    """Archivo de solo escritura para copy_expert que agrupa lo recibido en
+    bloques de CHUNK_SIZE y los deja en la cola"""
+
+    def __init__(self, cola, cancelado):
+        self._cola = cola
+        self._cancelado = cancelado
+        self._partes = []
+        self._tamano = 0
+
+    def write(self, datos):
+        self._partes.append(datos)
+        self._tamano += len(datos)
+        if self._tamano >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._partes:
+            return
+        bloque = b''.join(self._partes)
+        self._partes = []
+        self._tamano = 0
+        while True:
+            if self._cancelado.is_set():
+                raise ExportacionCancelada()
+            try:
+                self._cola.put(bloque, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def copy_csv_chunks(pool, sql, params=None):
+    """Generador de bloques CSV (bytes) producidos por COPY (sql) TO STDOUT.
+
+    COPY no admite parámetros, así que se interpolan antes con mogrify. La
+    conexión se toma del pool en el hilo de COPY y se devuelve al terminar o
+    al cancelar.
+    """
+    cola = queue.Queue(maxsize=MAX_CHUNKS_EN_COLA)
+    cancelado = threading.Event()
+
+    def copiar():
+        conn = None
+        cerrar = False
+        try:
+            conn = pool.getconn()
+            with conn.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                consulta = cursor.mogrify(sql, params or ()).decode()
+                destino = _DestinoCola(cola, cancelado)
+                cursor.copy_expert(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER true)",
+                                   destino, size=CHUNK_SIZE)
+                destino.flush()
+            conn.rollback()
+        except Exception as e:
+            # Una COPY interrumpida deja la conexión en un estado incierto
+            cerrar = True
+            if not cancelado.is_set():
+                cola.put(e)
+        finally:
+            if conn is not None:
+                pool.putconn(conn, close=cerrar or bool(conn.closed))
+            if not cancelado.is_set():
+                cola.put(_FIN)
+
+    hilo = threading.Thread(target=copiar, name="exportacion-csv", daemon=True)
+    hilo.start()
+    try:
+        while True:
+            bloque = cola.get()
+            if bloque is _FIN:
+                return
+            if isinstance(bloque, Exception):
+                raise bloque
+            yield bloque
+    finally:
+        cancelado.set()
+        # Liberar al hilo si quedó bloqueado en put()
+        while hilo.is_alive():
+            try:
+                cola.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        hilo.join()
+
+
+# ---------- XLSX ----------
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+_SHEET_INICIO = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                 '<sheetData>')
+_SHEET_FIN = '</sheetData></worksheet>'
+
+# Caracteres de control que XML 1.0 no admite
+_NO_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Salida:
+    """Destino sin seek para zipfile: acumula bytes hasta que el generador los retira"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _celda(valor):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, (date, datetime)):
+        valor = valor.isoformat()
+    texto = _NO_XML.sub('', str(valor))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(texto)}</t></is></c>'
+
+
+def _fila_xml(numero, valores):
+    return f'<row r="{numero}">' + ''.join(_celda(v) for v in valores) + '</row>'
+
+
+def xlsx_chunks(columnas, lotes, hoja='Datos'):
+    """Generador de bytes de un libro XLSX de una hoja.
+
+    columnas son los títulos de la primera fila; lotes es un iterable de
+    listas de filas (tuplas), por ejemplo los fetchmany de un cursor.
+    """
+    try:
+        yield from _xlsx(columnas, lotes, hoja)
+    finally:
+        if hasattr(lotes, 'close'):
+            lotes.close()
+
+
+def _xlsx(columnas, lotes, hoja):
+    salida = _Salida()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        libro.writestr('_rels/.rels', _RELS)
+        libro.writestr('xl/workbook.xml', _WORKBOOK.format(hoja=escape(hoja[:31])))
+        libro.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja_xml:
+            hoja_xml.write((_SHEET_INICIO + _fila_xml(1, columnas)).encode())
+            numero = 1
+            for lote in lotes:
+                partes = []
+                for fila in lote:
+                    numero += 1
+                    partes.append(_fila_xml(numero, fila))
+                hoja_xml.write(''.join(partes).encode())
+                datos = salida.retirar()
+                if datos:
+                    yield datos
+            hoja_xml.write(_SHEET_FIN.encode())
+    yield salida.retirar()
@@ -0,0 +1,93 @@
+# ========== GARANTÍAS POR VENCER ==========
+# El resumen por tramos se lee de Resumen_Garantias (init-db.sql), que los
+# triggers mantienen con la cantidad de compras por agrupación, grupo y día
+# de vencimiento. Los tramos se calculan al consultar a partir de
+# CURRENT_DATE, así el resumen no se vuelve viejo al cambiar el día: la
+# consulta recorre el rango [hoy, hoy + días] de su llave primaria y suma por
+# grupo.
+#
+# El listado de las compras por vencer usa idx_compras_fin_garantia
+# (Fin_Garantia, IdAsignadorCompra) con paginación por clave.
+
+DEFAULT_DIAS = 90
+MAX_DIAS = 365
+LIMITES_TRAMOS = (30, 60, 90)
+
+# agrupar -> (JOIN con el catálogo, nombre, nombre del grupo 0, columna en COMPRAS_SELECT)
+AGRUPACIONES = {
+    'ubicacion': ("LEFT JOIN Ubicaciones g ON g.IdUbicacion = r.Grupo",
+                  "g.NombreEdificio", "Sin ubicación", "u.Ubicacion"),
+    'proveedor': ("LEFT JOIN Proveedores g ON g.IdProveedor = r.Grupo",
+                  "g.Nombre", "Sin proveedor", "ac.Proveedor"),
+    'categoria': ("LEFT JOIN Categorias g ON g.IdCategoria = r.Grupo",
+                  "g.Nombre_Categoria", "Sin categoría", "p.Categoria"),
+}
+
+
+def parse_dias(valor):
+    try:
+        dias = int(valor)
+    except (TypeError, ValueError):
+        return DEFAULT_DIAS
+    return max(1, min(dias, MAX_DIAS))
+
+
+def tramos(dias):
+    """Tramos (desde, hasta) en días desde hoy que caben en la ventana.
+
+    Con la ventana de 90 días: (0, 30), (31, 60), (61, 90). Una ventana mayor
+    agrega un último tramo hasta dias; una menor recorta los tramos.
+    """
+    resultado = []
+    desde = 0
+    for limite in LIMITES_TRAMOS:
+        if desde > dias:
+            break
+        resultado.append((desde, min(limite, dias)))
+        desde = limite + 1
+    if desde <= dias:
+        resultado.append((desde, dias))
+    return resultado
+
+
+def etiqueta_tramo(tramo):
+    desde, hasta = tramo
+    return f"{desde}-{hasta}"
+
+
+def resumen_sql(agrupar, dias):
+    """Consulta de totales por grupo y tramo; parámetros %(agrupar)s y %(dias)s"""
+    join, nombre, sin_grupo, _ = AGRUPACIONES[agrupar]
+    sumas = ",\n           ".join(
+        f"COALESCE(sum(r.Total) FILTER (WHERE r.Fin_Garantia BETWEEN CURRENT_DATE + {desde} "
+        f"AND CURRENT_DATE + {hasta}), 0)::BIGINT AS tramo_{i}"
+        for i, (desde, hasta) in enumerate(tramos(dias))
+    )
+    return f"""
+    SELECT r.Grupo as id,
+           COALESCE({nombre}, '{sin_grupo}') as nombre,
+           {sumas},
+           sum(r.Total)::BIGINT as total
+    FROM Resumen_Garantias r
+    {join}
+    WHERE r.Agrupacion = %(agrupar)s
+      AND r.Fin_Garantia BETWEEN CURRENT_DATE AND CURRENT_DATE + %(dias)s
+    GROUP BY 1, 2
+    HAVING sum(r.Total) > 0
+    ORDER BY total DESC, nombre
+    """
+
+
+def armar_resumen(filas, dias):
+    """Convertir las filas de resumen_sql en grupos con la lista de tramos"""
+    cantidad = len(tramos(dias))
+    grupos = []
+    for fila in filas:
+        grupos.append({
+            'id': fila['id'],
+            'nombre': fila['nombre'],
+            'tramos': [fila[f'tramo_{i}'] for i in range(cantidad)],
+            'total': fila['total'],
+        })
+    totales = [sum(g['tramos'][i] for g in grupos) for i in range(cantidad)]
+    return grupos, totales
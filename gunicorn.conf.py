@@ -0,0 +1,59 @@
+# ========== CONFIGURACIÓN DE GUNICORN (PRODUCCIÓN) ==========
+# Uso: gunicorn -c gunicorn.conf.py
+#
+# Varios procesos (pre-fork) con hilos en cada uno. La aplicación se carga en
+# cada worker después del fork (sin preload_app), así los pools de conexiones
+# y los hilos de la caché se crean en el proceso que los usa.
+#
+# Recarga sin cortar peticiones: kill -HUP <pid del maestro>
+# (en Docker: docker compose kill -s HUP web). Los workers nuevos arrancan con
+# el código actual y los anteriores terminan lo que estaban atendiendo.
+import multiprocessing
+import os
+
+wsgi_app = "app:create_app()"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+workers = int(os.getenv('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = "gthread"
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Cada hilo ocupa una conexión por petición y las exportaciones abren otra
+# propia: el pool de cada worker se dimensiona con los hilos (en total,
+# workers * DB_POOL_MAX no debe superar max_connections de PostgreSQL)
+os.environ.setdefault('DB_POOL_MAX', str(threads * 2))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# Reciclar workers de vez en cuando acota el crecimiento de memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Los archivos estáticos con huella se generan una vez en el maestro,
+    # antes de crear los workers (ver assets.py)
+    from assets import construir
+    try:
+        construir()
+    except OSError as e:
+        server.log.warning("No se pudieron generar los archivos estáticos: %s", e)
+
+
+def on_reload(server):
+    on_starting(server)
+
+
+def post_fork(server, worker):
+    from db_pool import reset_after_fork
+    reset_after_fork()
+
+
+def worker_exit(server, worker):
+    from db_pool import close_all_pools
+    close_all_pools()
@@ -1,6 +1,13 @@
 -- Sistema de Inventario - Estructura inicial
 
 -- Eliminar tablas si existen (en orden correcto por dependencias)
+DROP TABLE IF EXISTS Contadores CASCADE;
+DROP TABLE IF EXISTS TCO_Pendientes CASCADE;
+DROP TABLE IF EXISTS Resumen_TCO_Grupos CASCADE;
+DROP TABLE IF EXISTS Resumen_TCO CASCADE;
+DROP TABLE IF EXISTS Versiones_Tablas CASCADE;
+DROP TABLE IF EXISTS Resumen_Garantias CASCADE;
+DROP TABLE IF EXISTS Relacion_Entre_Compras CASCADE;
 DROP TABLE IF EXISTS Mantenimientos CASCADE;
 DROP TABLE IF EXISTS AsignadorCompra CASCADE;
 DROP TABLE IF EXISTS Usuarios CASCADE;
@@ -25,6 +32,7 @@ CREATE TABLE Productos (
     Nombre VARCHAR(255) NOT NULL,
     Precio_Estandar DECIMAL(10,2),
     Categoria BIGINT NOT NULL,
+    Es_Producto_Madre BOOLEAN NOT NULL DEFAULT FALSE,
     CONSTRAINT fk_producto_categoria FOREIGN KEY (Categoria) 
         REFERENCES Categorias(IdCategoria) ON DELETE RESTRICT
 );
@@ -83,23 +91,668 @@ CREATE TABLE Mantenimientos (
         REFERENCES AsignadorCompra(IdAsignadorCompra) ON DELETE CASCADE
 );
 
+-- Tabla de relaciones entre compras (ensambles: una sub compra puede ser a su
+-- vez madre de otras, ej: rack -> servidor -> disco)
+CREATE TABLE Relacion_Entre_Compras (
+    IdRelacion_Entre_Compras SERIAL PRIMARY KEY,
+    IdCompra_Madre BIGINT NOT NULL,
+    IdSub_Compra BIGINT NOT NULL,
+    CONSTRAINT fk_relacion_madre FOREIGN KEY (IdCompra_Madre) 
+        REFERENCES AsignadorCompra(IdAsignadorCompra) ON DELETE CASCADE,
+    CONSTRAINT fk_relacion_sub FOREIGN KEY (IdSub_Compra) 
+        REFERENCES AsignadorCompra(IdAsignadorCompra) ON DELETE CASCADE,
+    CONSTRAINT chk_relacion_distintas CHECK (IdCompra_Madre <> IdSub_Compra),
+    CONSTRAINT uq_relacion_madre_sub UNIQUE (IdCompra_Madre, IdSub_Compra)
+);
+
 -- ==================================================
 -- ÍNDICES PARA OPTIMIZACIÓN
 -- ==================================================
 
+-- Los índices sobre columnas de orden incluyen la llave primaria (paginación por clave)
 CREATE INDEX idx_productos_categoria ON Productos(Categoria);
-CREATE INDEX idx_productos_nombre ON Productos(Nombre);
+CREATE INDEX idx_productos_nombre ON Productos(Nombre, IdProducto);
+-- Orden por defecto del listado: madres primero, luego por nombre
+CREATE INDEX idx_productos_madre_nombre ON Productos(Es_Producto_Madre DESC, Nombre, IdProducto);
 
 CREATE INDEX idx_usuarios_ubicacion ON Usuarios(Ubicacion);
-CREATE INDEX idx_usuarios_nombre ON Usuarios(Nombre);
+CREATE INDEX idx_usuarios_nombre ON Usuarios(Nombre, IdUsuario);
 
 CREATE INDEX idx_compras_producto ON AsignadorCompra(Producto);
 CREATE INDEX idx_compras_proveedor ON AsignadorCompra(Proveedor);
 CREATE INDEX idx_compras_usuario ON AsignadorCompra(Comprado_Para);
-CREATE INDEX idx_compras_fecha ON AsignadorCompra(Fecha_Compra);
+CREATE INDEX idx_compras_fecha ON AsignadorCompra(Fecha_Compra, IdAsignadorCompra);
 
 CREATE INDEX idx_mantenimientos_compra ON Mantenimientos(Compra);
-CREATE INDEX idx_mantenimientos_fecha_inicio ON Mantenimientos(Fecha_Inicio);
+
+-- Orden del listado de mantenimientos: "col ASC|DESC NULLS LAST, IdMantenimiento"
+-- (las dos fechas admiten NULL). Un índice ascendente recorrido al revés da
+-- DESC NULLS FIRST, por eso cada columna lleva uno por dirección; las páginas
+-- anteriores recorren el mismo índice en sentido contrario. La búsqueda de la
+-- página (paginacion.py) separa los NULL en su propia rama para que cada una
+-- sea un rango del índice. Problema_Presentado no lleva índice: es texto libre
+-- sin límite de largo (una fila de btree admite ~2.7 KB) y se ordena con top-N.
+CREATE INDEX idx_mantenimientos_fecha_inicio ON Mantenimientos(Fecha_Inicio, IdMantenimiento);
+CREATE INDEX idx_mantenimientos_fecha_inicio_desc ON Mantenimientos(Fecha_Inicio DESC NULLS LAST, IdMantenimiento DESC);
+CREATE INDEX idx_mantenimientos_fecha_final ON Mantenimientos(Fecha_Final, IdMantenimiento);
+CREATE INDEX idx_mantenimientos_fecha_final_desc ON Mantenimientos(Fecha_Final DESC NULLS LAST, IdMantenimiento DESC);
+
+-- Recorridos del árbol de ensambles (jerarquia.py): hacia abajo se usa el índice
+-- de uq_relacion_madre_sub (madre, sub); hacia arriba, este por la sub compra
+CREATE INDEX idx_relaciones_sub ON Relacion_Entre_Compras(IdSub_Compra, IdCompra_Madre);
+
+-- Búsqueda por subcadena de los filtros (ILIKE '%texto%'): un índice btree no
+-- sirve con el comodín inicial, un GIN de trigramas sí
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_productos_nombre_trgm ON Productos USING gin (Nombre gin_trgm_ops);
+CREATE INDEX idx_usuarios_nombre_trgm ON Usuarios USING gin (Nombre gin_trgm_ops);
+CREATE INDEX idx_proveedores_nombre_trgm ON Proveedores USING gin (Nombre gin_trgm_ops);
+CREATE INDEX idx_compras_serie_trgm ON AsignadorCompra USING gin (NumeroSerie gin_trgm_ops);
+
+-- ==================================================
+-- BÚSQUEDA DE TEXTO EN MANTENIMIENTOS
+-- ==================================================
+-- Problema (peso A), diagnóstico (B) y observaciones (C) en una columna
+-- tsvector con la configuración 'spanish': "pantallas" encuentra "pantalla" y
+-- las palabras vacías no cuentan. PostgreSQL la recalcula al insertar o
+-- modificar; el índice GIN resuelve el @@ sin leer la tabla.
+ALTER TABLE Mantenimientos ADD COLUMN Busqueda tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('spanish', COALESCE(Problema_Presentado, '')), 'A') ||
+    setweight(to_tsvector('spanish', COALESCE(Diagnostico, '')), 'B') ||
+    setweight(to_tsvector('spanish', COALESCE(Observaciones, '')), 'C')
+) STORED;
+
+CREATE INDEX idx_mantenimientos_busqueda ON Mantenimientos USING gin (Busqueda);
+
+-- ==================================================
+-- CONTADORES DEL DASHBOARD
+-- ==================================================
+-- Totales por tabla mantenidos por triggers de sentencia, para que la página
+-- de inicio lea todas las estadísticas con una sola búsqueda por clave en
+-- lugar de un COUNT(*) por tabla. recalcular_contadores() restablece los
+-- valores exactos (se expone como acción de administración en la app).
+
+CREATE TABLE Contadores (
+    Tabla VARCHAR(63) PRIMARY KEY,
+    Total BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO Contadores (Tabla) VALUES
+    ('productos'),
+    ('asignadorcompra'),
+    ('usuarios'),
+    ('mantenimientos');
+
+CREATE OR REPLACE FUNCTION contador_filas_insertadas() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Contadores SET Total = Total + (SELECT COUNT(*) FROM filas) WHERE Tabla = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION contador_filas_eliminadas() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Contadores SET Total = Total - (SELECT COUNT(*) FROM filas) WHERE Tabla = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION contador_tabla_vaciada() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Contadores SET Total = 0 WHERE Tabla = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION recalcular_contadores() RETURNS VOID AS $$
+BEGIN
+    -- Bloquear escrituras mientras se cuenta para no perder inserciones concurrentes
+    LOCK TABLE Productos, AsignadorCompra, Usuarios, Mantenimientos IN SHARE MODE;
+    INSERT INTO Contadores (Tabla, Total) VALUES
+        ('productos', (SELECT COUNT(*) FROM Productos)),
+        ('asignadorcompra', (SELECT COUNT(*) FROM AsignadorCompra)),
+        ('usuarios', (SELECT COUNT(*) FROM Usuarios)),
+        ('mantenimientos', (SELECT COUNT(*) FROM Mantenimientos))
+    ON CONFLICT (Tabla) DO UPDATE SET Total = EXCLUDED.Total;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tabla TEXT;
+BEGIN
+    FOREACH tabla IN ARRAY ARRAY['productos', 'asignadorcompra', 'usuarios', 'mantenimientos'] LOOP
+        EXECUTE format('CREATE TRIGGER trg_contador_insert AFTER INSERT ON %I
+                        REFERENCING NEW TABLE AS filas
+                        FOR EACH STATEMENT EXECUTE FUNCTION contador_filas_insertadas()', tabla);
+        EXECUTE format('CREATE TRIGGER trg_contador_delete AFTER DELETE ON %I
+                        REFERENCING OLD TABLE AS filas
+                        FOR EACH STATEMENT EXECUTE FUNCTION contador_filas_eliminadas()', tabla);
+        EXECUTE format('CREATE TRIGGER trg_contador_truncate AFTER TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION contador_tabla_vaciada()', tabla);
+    END LOOP;
+END $$;
+
+-- ==================================================
+-- VERSIONES DE LAS TABLAS
+-- ==================================================
+-- Cada sentencia que escribe en una tabla incrementa su versión. Las páginas
+-- de listado arman su ETag con las versiones de las tablas que leen y
+-- responden 304 sin consultar ni renderizar si ninguna cambió. Al ser una fila
+-- actualizada dentro de la transacción, la versión nueva solo se ve cuando se
+-- confirman los datos que la cambiaron.
+
+CREATE TABLE Versiones_Tablas (
+    Tabla VARCHAR(63) PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0,
+    Modificado TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO Versiones_Tablas (Tabla) VALUES
+    ('categorias'),
+    ('proveedores'),
+    ('productos'),
+    ('ubicaciones'),
+    ('usuarios'),
+    ('asignadorcompra'),
+    ('mantenimientos'),
+    ('relacion_entre_compras');
+
+CREATE OR REPLACE FUNCTION version_tabla_modificada() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Versiones_Tablas SET Version = Version + 1, Modificado = clock_timestamp()
+    WHERE Tabla = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Para cargas con los triggers desactivados (seed, generar_datos.py)
+CREATE OR REPLACE FUNCTION marcar_tablas_modificadas() RETURNS VOID AS $$
+BEGIN
+    UPDATE Versiones_Tablas SET Version = Version + 1, Modificado = clock_timestamp();
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tabla TEXT;
+BEGIN
+    FOR tabla IN SELECT v.Tabla FROM Versiones_Tablas v LOOP
+        EXECUTE format('CREATE TRIGGER trg_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION version_tabla_modificada()', tabla);
+    END LOOP;
+END $$;
+
+-- ==================================================
+-- GARANTÍAS POR VENCER
+-- ==================================================
+-- Las compras por vencer se listan con un rango sobre este índice (y la llave
+-- primaria como desempate para la paginación por clave)
+CREATE INDEX idx_compras_fin_garantia ON AsignadorCompra(Fin_Garantia, IdAsignadorCompra)
+    WHERE Fin_Garantia IS NOT NULL;
+
+-- Cantidad de compras por agrupación (ubicación del usuario, proveedor o
+-- categoría del producto), grupo (0 = sin usuario / sin producto) y día de
+-- vencimiento. Los tramos de 30/60/90 días se suman al consultar sobre el
+-- rango de fechas de la llave primaria: se leen a lo sumo días × grupos filas
+-- de una agrupación, no el historial de compras.
+-- Se mantiene con triggers de sentencia; recalcular_resumen_garantias() la
+-- reconstruye (después de cargas con los triggers desactivados).
+CREATE TABLE Resumen_Garantias (
+    Agrupacion VARCHAR(20) NOT NULL,
+    Fin_Garantia DATE NOT NULL,
+    Grupo BIGINT NOT NULL,
+    Total BIGINT NOT NULL,
+    PRIMARY KEY (Agrupacion, Fin_Garantia, Grupo)
+);
+
+-- Compras agregadas y quitadas en la sentencia (signo +1 / -1), sumadas por
+-- grupo en cada agrupación: una UPDATE que no toca columnas del resumen no
+-- cambia nada
+CREATE OR REPLACE FUNCTION resumen_garantias_compras() RETURNS TRIGGER AS $$
+DECLARE
+    cambios TEXT;
+BEGIN
+    cambios := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT Fin_Garantia, Comprado_Para, Proveedor, Producto, 1 AS signo FROM nuevas'
+        WHEN 'DELETE' THEN 'SELECT Fin_Garantia, Comprado_Para, Proveedor, Producto, -1 AS signo FROM viejas'
+        ELSE 'SELECT Fin_Garantia, Comprado_Para, Proveedor, Producto, 1 AS signo FROM nuevas
+              UNION ALL
+              SELECT Fin_Garantia, Comprado_Para, Proveedor, Producto, -1 FROM viejas'
+    END;
+    EXECUTE format($sql$
+        INSERT INTO Resumen_Garantias AS r (Agrupacion, Fin_Garantia, Grupo, Total)
+        SELECT g.Agrupacion, c.Fin_Garantia, g.Grupo, sum(c.signo)
+        FROM (%s) c
+        LEFT JOIN Usuarios u ON u.IdUsuario = c.Comprado_Para
+        LEFT JOIN Productos p ON p.IdProducto = c.Producto
+        CROSS JOIN LATERAL (VALUES ('ubicacion', COALESCE(u.Ubicacion, 0)),
+                                   ('proveedor', c.Proveedor),
+                                   ('categoria', COALESCE(p.Categoria, 0))) AS g(Agrupacion, Grupo)
+        WHERE c.Fin_Garantia IS NOT NULL
+        GROUP BY 1, 2, 3
+        HAVING sum(c.signo) <> 0
+        ON CONFLICT (Agrupacion, Fin_Garantia, Grupo)
+        DO UPDATE SET Total = r.Total + EXCLUDED.Total
+    $sql$, cambios);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un usuario que cambia de ubicación mueve sus compras de grupo
+CREATE OR REPLACE FUNCTION resumen_garantias_usuarios() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO Resumen_Garantias AS r (Agrupacion, Fin_Garantia, Grupo, Total)
+    SELECT 'ubicacion', ac.Fin_Garantia, m.Ubicacion, sum(m.signo)
+    FROM (
+        SELECT v.IdUsuario, v.Ubicacion, -1 AS signo
+        FROM viejas v JOIN nuevas n ON n.IdUsuario = v.IdUsuario
+        WHERE v.Ubicacion IS DISTINCT FROM n.Ubicacion
+        UNION ALL
+        SELECT n.IdUsuario, n.Ubicacion, 1
+        FROM viejas v JOIN nuevas n ON n.IdUsuario = v.IdUsuario
+        WHERE v.Ubicacion IS DISTINCT FROM n.Ubicacion
+    ) m
+    JOIN AsignadorCompra ac ON ac.Comprado_Para = m.IdUsuario AND ac.Fin_Garantia IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (Agrupacion, Fin_Garantia, Grupo)
+    DO UPDATE SET Total = r.Total + EXCLUDED.Total;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Antes de borrar un usuario sus compras pasan al grupo "sin ubicación": la
+-- llave foránea las deja sin usuario y el trigger de compras ya no encuentra
+-- la ubicación anterior
+CREATE OR REPLACE FUNCTION resumen_garantias_usuario_borrado() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO Resumen_Garantias AS r (Agrupacion, Fin_Garantia, Grupo, Total)
+    SELECT 'ubicacion', ac.Fin_Garantia, g.Grupo, sum(g.signo)
+    FROM AsignadorCompra ac
+    CROSS JOIN (VALUES (OLD.Ubicacion, -1), (0, 1)) AS g(Grupo, signo)
+    WHERE ac.Comprado_Para = OLD.IdUsuario AND ac.Fin_Garantia IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (Agrupacion, Fin_Garantia, Grupo)
+    DO UPDATE SET Total = r.Total + EXCLUDED.Total;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un producto que cambia de categoría mueve sus compras de grupo
+CREATE OR REPLACE FUNCTION resumen_garantias_productos() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO Resumen_Garantias AS r (Agrupacion, Fin_Garantia, Grupo, Total)
+    SELECT 'categoria', ac.Fin_Garantia, m.Categoria, sum(m.signo)
+    FROM (
+        SELECT v.IdProducto, v.Categoria, -1 AS signo
+        FROM viejas v JOIN nuevas n ON n.IdProducto = v.IdProducto
+        WHERE v.Categoria IS DISTINCT FROM n.Categoria
+        UNION ALL
+        SELECT n.IdProducto, n.Categoria, 1
+        FROM viejas v JOIN nuevas n ON n.IdProducto = v.IdProducto
+        WHERE v.Categoria IS DISTINCT FROM n.Categoria
+    ) m
+    JOIN AsignadorCompra ac ON ac.Producto = m.IdProducto AND ac.Fin_Garantia IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (Agrupacion, Fin_Garantia, Grupo)
+    DO UPDATE SET Total = r.Total + EXCLUDED.Total;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION resumen_garantias_vaciar() RETURNS TRIGGER AS $$
+BEGIN
+    TRUNCATE Resumen_Garantias;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION recalcular_resumen_garantias() RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE AsignadorCompra, Usuarios, Productos IN SHARE MODE;
+    TRUNCATE Resumen_Garantias;
+    INSERT INTO Resumen_Garantias (Agrupacion, Fin_Garantia, Grupo, Total)
+    SELECT g.Agrupacion, ac.Fin_Garantia, g.Grupo, count(*)
+    FROM AsignadorCompra ac
+    LEFT JOIN Usuarios u ON u.IdUsuario = ac.Comprado_Para
+    LEFT JOIN Productos p ON p.IdProducto = ac.Producto
+    CROSS JOIN LATERAL (VALUES ('ubicacion', COALESCE(u.Ubicacion, 0)),
+                               ('proveedor', ac.Proveedor),
+                               ('categoria', COALESCE(p.Categoria, 0))) AS g(Agrupacion, Grupo)
+    WHERE ac.Fin_Garantia IS NOT NULL
+    GROUP BY 1, 2, 3;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_garantias_insert AFTER INSERT ON AsignadorCompra
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION resumen_garantias_compras();
+CREATE TRIGGER trg_garantias_update AFTER UPDATE ON AsignadorCompra
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION resumen_garantias_compras();
+CREATE TRIGGER trg_garantias_delete AFTER DELETE ON AsignadorCompra
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION resumen_garantias_compras();
+CREATE TRIGGER trg_garantias_truncate AFTER TRUNCATE ON AsignadorCompra
+    FOR EACH STATEMENT EXECUTE FUNCTION resumen_garantias_vaciar();
+CREATE TRIGGER trg_garantias_usuarios AFTER UPDATE ON Usuarios
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION resumen_garantias_usuarios();
+CREATE TRIGGER trg_garantias_usuario_borrado BEFORE DELETE ON Usuarios
+    FOR EACH ROW EXECUTE FUNCTION resumen_garantias_usuario_borrado();
+CREATE TRIGGER trg_garantias_productos AFTER UPDATE ON Productos
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION resumen_garantias_productos();
+
+-- ==================================================
+-- COSTO TOTAL DE PROPIEDAD (TCO)
+-- ==================================================
+-- Resumen por compra: precio (el de la compra o, si no tiene, el estándar del
+-- producto), mantenimientos (cantidad, abiertos y días de los cerrados) y
+-- componentes directos (Relacion_Entre_Compras) con la suma de sus precios.
+-- Resumen_TCO_Grupos acumula lo mismo por producto y por usuario (grupo 0 =
+-- sin producto / sin usuario); ahí no se suman los componentes, que ya son
+-- compras del mismo usuario.
+--
+-- Los triggers solo anotan en TCO_Pendientes las compras afectadas;
+-- refrescar_resumen_tco() recalcula esas compras y aplica la diferencia a los
+-- grupos, así el reporte nunca recorre el historial completo. La aplicación lo
+-- llama al final de cada transacción de escritura, antes del commit: el
+-- resumen se confirma junto con los datos que lo cambiaron y las lecturas del
+-- reporte no escriben.
+-- recalcular_resumen_tco() lo reconstruye todo (después de cargas con los
+-- triggers desactivados).
+CREATE TABLE Resumen_TCO (
+    Compra BIGINT PRIMARY KEY,
+    Producto BIGINT NOT NULL,
+    Usuario BIGINT NOT NULL,
+    Precio DECIMAL(14,2) NOT NULL,
+    Precio_Estimado BOOLEAN NOT NULL,
+    Mantenimientos INTEGER NOT NULL,
+    Mantenimientos_Abiertos INTEGER NOT NULL,
+    Dias_Mantenimiento INTEGER NOT NULL,
+    Componentes INTEGER NOT NULL,
+    Precio_Componentes DECIMAL(14,2) NOT NULL,
+    Costo_Total DECIMAL(14,2) GENERATED ALWAYS AS (Precio + Precio_Componentes) STORED
+);
+
+-- Listado por costo (paginación por clave), general o de un grupo
+CREATE INDEX idx_resumen_tco_costo ON Resumen_TCO(Costo_Total, Compra);
+CREATE INDEX idx_resumen_tco_producto ON Resumen_TCO(Producto, Costo_Total, Compra);
+CREATE INDEX idx_resumen_tco_usuario ON Resumen_TCO(Usuario, Costo_Total, Compra);
+
+CREATE TABLE Resumen_TCO_Grupos (
+    Agrupacion VARCHAR(20) NOT NULL,
+    Grupo BIGINT NOT NULL,
+    Compras BIGINT NOT NULL,
+    Precio DECIMAL(16,2) NOT NULL,
+    Mantenimientos BIGINT NOT NULL,
+    Mantenimientos_Abiertos BIGINT NOT NULL,
+    Dias_Mantenimiento BIGINT NOT NULL,
+    PRIMARY KEY (Agrupacion, Grupo)
+);
+
+CREATE INDEX idx_resumen_tco_grupos_precio ON Resumen_TCO_Grupos(Agrupacion, Precio, Grupo);
+
+-- Sin llave única: una compra anotada mientras se refresca queda para el
+-- refresco siguiente en lugar de confundirse con la que se está procesando
+CREATE TABLE TCO_Pendientes (
+    Id BIGSERIAL PRIMARY KEY,
+    Compra BIGINT NOT NULL
+);
+
+-- Compras cuyo precio, producto o usuario cambió, más las compras madre de
+-- las que son componentes (su precio entra en Precio_Componentes)
+CREATE OR REPLACE FUNCTION tco_encolar_compras() RETURNS TRIGGER AS $$
+DECLARE
+    cambiadas TEXT;
+BEGIN
+    cambiadas := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT IdAsignadorCompra FROM nuevas'
+        WHEN 'DELETE' THEN 'SELECT IdAsignadorCompra FROM viejas'
+        ELSE 'SELECT n.IdAsignadorCompra FROM nuevas n JOIN viejas v USING (IdAsignadorCompra)
+              WHERE (n.Producto, n.Precio, n.Comprado_Para)
+                    IS DISTINCT FROM (v.Producto, v.Precio, v.Comprado_Para)'
+    END;
+    EXECUTE format($sql$
+        WITH cambiadas AS (%s)
+        INSERT INTO TCO_Pendientes (Compra)
+        SELECT IdAsignadorCompra FROM cambiadas
+        UNION
+        SELECT r.IdCompra_Madre
+        FROM cambiadas c
+        JOIN Relacion_Entre_Compras r ON r.IdSub_Compra = c.IdAsignadorCompra
+    $sql$, cambiadas);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mantenimientos y relaciones: la compra está en la columna TG_ARGV[0]
+CREATE OR REPLACE FUNCTION tco_encolar() RETURNS TRIGGER AS $$
+DECLARE
+    filas TEXT;
+BEGIN
+    filas := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT %I AS Compra FROM nuevas', TG_ARGV[0])
+        WHEN 'DELETE' THEN format('SELECT %I AS Compra FROM viejas', TG_ARGV[0])
+        ELSE format('SELECT %1$I AS Compra FROM nuevas UNION SELECT %1$I FROM viejas', TG_ARGV[0])
+    END;
+    EXECUTE format('INSERT INTO TCO_Pendientes (Compra) SELECT DISTINCT Compra FROM (%s) c', filas);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un cambio de precio estándar afecta a las compras sin precio del producto
+CREATE OR REPLACE FUNCTION tco_encolar_productos() RETURNS TRIGGER AS $$
+BEGIN
+    WITH compras AS (
+        SELECT ac.IdAsignadorCompra
+        FROM viejas v
+        JOIN nuevas n ON n.IdProducto = v.IdProducto
+        JOIN AsignadorCompra ac ON ac.Producto = n.IdProducto AND ac.Precio IS NULL
+        WHERE v.Precio_Estandar IS DISTINCT FROM n.Precio_Estandar
+    )
+    INSERT INTO TCO_Pendientes (Compra)
+    SELECT IdAsignadorCompra FROM compras
+    UNION
+    SELECT r.IdCompra_Madre
+    FROM compras c
+    JOIN Relacion_Entre_Compras r ON r.IdSub_Compra = c.IdAsignadorCompra;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tco_vaciar() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'asignadorcompra' THEN
+        TRUNCATE Resumen_TCO, Resumen_TCO_Grupos, TCO_Pendientes;
+    ELSE
+        -- Sin mantenimientos o sin relaciones: solo cambian las compras que tenían
+        INSERT INTO TCO_Pendientes (Compra)
+        SELECT Compra FROM Resumen_TCO
+        WHERE CASE TG_TABLE_NAME WHEN 'mantenimientos' THEN Mantenimientos > 0 ELSE Componentes > 0 END;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fila de Resumen_TCO de cada compra de la consulta "compras" (columna Compra)
+CREATE OR REPLACE FUNCTION tco_calcular_sql(compras TEXT) RETURNS TEXT AS $$
+    SELECT format($sql$
+        SELECT ac.IdAsignadorCompra AS Compra,
+               COALESCE(ac.Producto, 0) AS Producto,
+               COALESCE(ac.Comprado_Para, 0) AS Usuario,
+               COALESCE(ac.Precio, p.Precio_Estandar, 0) AS Precio,
+               ac.Precio IS NULL AS Precio_Estimado,
+               COALESCE(m.Cantidad, 0) AS Mantenimientos,
+               COALESCE(m.Abiertos, 0) AS Mantenimientos_Abiertos,
+               COALESCE(m.Dias, 0) AS Dias_Mantenimiento,
+               COALESCE(k.Cantidad, 0) AS Componentes,
+               COALESCE(k.Precio, 0) AS Precio_Componentes
+        FROM (%s) c
+        JOIN AsignadorCompra ac ON ac.IdAsignadorCompra = c.Compra
+        LEFT JOIN Productos p ON p.IdProducto = ac.Producto
+        LEFT JOIN LATERAL (
+            SELECT count(*) AS Cantidad,
+                   count(*) FILTER (WHERE mt.Fecha_Final IS NULL) AS Abiertos,
+                   sum(mt.Fecha_Final - mt.Fecha_Inicio) AS Dias
+            FROM Mantenimientos mt
+            WHERE mt.Compra = ac.IdAsignadorCompra
+        ) m ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT count(*) AS Cantidad,
+                   sum(COALESCE(h.Precio, hp.Precio_Estandar, 0)) AS Precio
+            FROM Relacion_Entre_Compras r
+            JOIN AsignadorCompra h ON h.IdAsignadorCompra = r.IdSub_Compra
+            LEFT JOIN Productos hp ON hp.IdProducto = h.Producto
+            WHERE r.IdCompra_Madre = ac.IdAsignadorCompra
+        ) k ON TRUE
+    $sql$, compras);
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Procesar las compras anotadas; devuelve cuántas se recalcularon (0 sin
+-- pendientes, sin tomar el candado). Si otra transacción ya está refrescando,
+-- con esperar la espera y después procesa también lo que esa no vio; si no,
+-- devuelve NULL y deja las compras para el refresco siguiente.
+CREATE OR REPLACE FUNCTION refrescar_resumen_tco(esperar BOOLEAN DEFAULT FALSE) RETURNS INTEGER AS $$
+DECLARE
+    cantidad INTEGER;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM TCO_Pendientes) THEN
+        RETURN 0;
+    END IF;
+    IF esperar THEN
+        PERFORM pg_advisory_xact_lock(hashtext('resumen_tco'));
+    ELSIF NOT pg_try_advisory_xact_lock(hashtext('resumen_tco')) THEN
+        RETURN NULL;
+    END IF;
+    EXECUTE format($sql$
+        WITH pendientes AS (
+            DELETE FROM TCO_Pendientes RETURNING Compra
+        ),
+        compras AS (
+            SELECT DISTINCT Compra FROM pendientes
+        ),
+        viejas AS (
+            SELECT r.* FROM Resumen_TCO r JOIN compras c USING (Compra)
+        ),
+        nuevas AS (%s),
+        borradas AS (
+            DELETE FROM Resumen_TCO r
+            USING viejas v
+            WHERE r.Compra = v.Compra
+              AND NOT EXISTS (SELECT 1 FROM nuevas n WHERE n.Compra = v.Compra)
+        ),
+        guardadas AS (
+            INSERT INTO Resumen_TCO (Compra, Producto, Usuario, Precio, Precio_Estimado,
+                                     Mantenimientos, Mantenimientos_Abiertos, Dias_Mantenimiento,
+                                     Componentes, Precio_Componentes)
+            SELECT * FROM nuevas
+            ON CONFLICT (Compra) DO UPDATE SET
+                Producto = EXCLUDED.Producto,
+                Usuario = EXCLUDED.Usuario,
+                Precio = EXCLUDED.Precio,
+                Precio_Estimado = EXCLUDED.Precio_Estimado,
+                Mantenimientos = EXCLUDED.Mantenimientos,
+                Mantenimientos_Abiertos = EXCLUDED.Mantenimientos_Abiertos,
+                Dias_Mantenimiento = EXCLUDED.Dias_Mantenimiento,
+                Componentes = EXCLUDED.Componentes,
+                Precio_Componentes = EXCLUDED.Precio_Componentes
+        ),
+        -- Cada compra resta su fila anterior y suma la nueva en sus dos grupos
+        diferencias AS (
+            SELECT Producto, Usuario, 1 AS signo, Precio, Mantenimientos,
+                   Mantenimientos_Abiertos, Dias_Mantenimiento
+            FROM nuevas
+            UNION ALL
+            SELECT Producto, Usuario, -1, Precio, Mantenimientos,
+                   Mantenimientos_Abiertos, Dias_Mantenimiento
+            FROM viejas
+        ),
+        grupos AS (
+            INSERT INTO Resumen_TCO_Grupos AS g (Agrupacion, Grupo, Compras, Precio, Mantenimientos,
+                                                 Mantenimientos_Abiertos, Dias_Mantenimiento)
+            SELECT a.Agrupacion, a.Grupo, sum(d.signo), sum(d.signo * d.Precio),
+                   sum(d.signo * d.Mantenimientos), sum(d.signo * d.Mantenimientos_Abiertos),
+                   sum(d.signo * d.Dias_Mantenimiento)
+            FROM diferencias d
+            CROSS JOIN LATERAL (VALUES ('producto', d.Producto),
+                                       ('usuario', d.Usuario)) AS a(Agrupacion, Grupo)
+            GROUP BY 1, 2
+            ON CONFLICT (Agrupacion, Grupo) DO UPDATE SET
+                Compras = g.Compras + EXCLUDED.Compras,
+                Precio = g.Precio + EXCLUDED.Precio,
+                Mantenimientos = g.Mantenimientos + EXCLUDED.Mantenimientos,
+                Mantenimientos_Abiertos = g.Mantenimientos_Abiertos + EXCLUDED.Mantenimientos_Abiertos,
+                Dias_Mantenimiento = g.Dias_Mantenimiento + EXCLUDED.Dias_Mantenimiento
+        )
+        SELECT count(*) FROM compras
+    $sql$, tco_calcular_sql('SELECT Compra FROM compras')) INTO cantidad;
+    IF cantidad > 0 THEN
+        DELETE FROM Resumen_TCO_Grupos WHERE Compras = 0;
+    END IF;
+    RETURN cantidad;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION recalcular_resumen_tco() RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('resumen_tco'));
+    LOCK TABLE AsignadorCompra, Mantenimientos, Relacion_Entre_Compras, Productos IN SHARE MODE;
+    TRUNCATE Resumen_TCO, Resumen_TCO_Grupos, TCO_Pendientes;
+    EXECUTE format($sql$
+        INSERT INTO Resumen_TCO (Compra, Producto, Usuario, Precio, Precio_Estimado,
+                                 Mantenimientos, Mantenimientos_Abiertos, Dias_Mantenimiento,
+                                 Componentes, Precio_Componentes)
+        %s
+    $sql$, tco_calcular_sql('SELECT IdAsignadorCompra AS Compra FROM AsignadorCompra'));
+    INSERT INTO Resumen_TCO_Grupos (Agrupacion, Grupo, Compras, Precio, Mantenimientos,
+                                    Mantenimientos_Abiertos, Dias_Mantenimiento)
+    SELECT a.Agrupacion, a.Grupo, count(*), sum(r.Precio), sum(r.Mantenimientos),
+           sum(r.Mantenimientos_Abiertos), sum(r.Dias_Mantenimiento)
+    FROM Resumen_TCO r
+    CROSS JOIN LATERAL (VALUES ('producto', r.Producto),
+                               ('usuario', r.Usuario)) AS a(Agrupacion, Grupo)
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_tco_insert AFTER INSERT ON AsignadorCompra
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION tco_encolar_compras();
+CREATE TRIGGER trg_tco_update AFTER UPDATE ON AsignadorCompra
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION tco_encolar_compras();
+CREATE TRIGGER trg_tco_delete AFTER DELETE ON AsignadorCompra
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION tco_encolar_compras();
+CREATE TRIGGER trg_tco_productos AFTER UPDATE ON Productos
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION tco_encolar_productos();
+
+DO $$
+DECLARE
+    tabla TEXT;
+    columna TEXT;
+BEGIN
+    FOR tabla, columna IN VALUES ('mantenimientos', 'compra'),
+                                 ('relacion_entre_compras', 'idcompra_madre') LOOP
+        EXECUTE format('CREATE TRIGGER trg_tco_insert AFTER INSERT ON %I
+                        REFERENCING NEW TABLE AS nuevas
+                        FOR EACH STATEMENT EXECUTE FUNCTION tco_encolar(%L)', tabla, columna);
+        EXECUTE format('CREATE TRIGGER trg_tco_update AFTER UPDATE ON %I
+                        REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+                        FOR EACH STATEMENT EXECUTE FUNCTION tco_encolar(%L)', tabla, columna);
+        EXECUTE format('CREATE TRIGGER trg_tco_delete AFTER DELETE ON %I
+                        REFERENCING OLD TABLE AS viejas
+                        FOR EACH STATEMENT EXECUTE FUNCTION tco_encolar(%L)', tabla, columna);
+    END LOOP;
+    FOREACH tabla IN ARRAY ARRAY['asignadorcompra', 'mantenimientos', 'relacion_entre_compras'] LOOP
+        EXECUTE format('CREATE TRIGGER trg_tco_truncate AFTER TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION tco_vaciar()', tabla);
+    END LOOP;
+END $$;
 
 -- ==================================================
 -- DATOS INICIALES
@@ -0,0 +1,132 @@
+# ========== JERARQUÍA DE COMPRAS (ENSAMBLES) ==========
+# Relacion_Entre_Compras une una compra madre con sus sub compras, y una sub
+# compra puede ser a su vez madre de otras (rack -> servidor -> disco). Cada
+# recorrido es una sola consulta WITH RECURSIVE: hacia abajo por
+# IdCompra_Madre y hacia arriba por IdSub_Compra, ambas columnas indexadas, así
+# cada nivel es una búsqueda por índice sin importar la profundidad.
+#
+# La ruta acumulada (arreglo de IDs) impide visitar dos veces un nodo en la
+# misma rama aunque la tabla llegara a tener un ciclo; agregar_relacion los
+# rechaza al insertar con INSERTAR_RELACION_SQL.
+
+_DETALLE_NODO = """
+           ac.NumeroSerie as numero_serie,
+           p.Nombre as producto_nombre,
+           p.Es_Producto_Madre as es_madre,
+           u.Nombre as usuario_nombre
+"""
+
+_JOINS_NODO = """
+    JOIN AsignadorCompra ac ON ac.IdAsignadorCompra = n.id
+    LEFT JOIN Productos p ON ac.Producto = p.IdProducto
+    LEFT JOIN Usuarios u ON ac.Comprado_Para = u.IdUsuario
+"""
+
+# Compra %(id)s y todas sus sub compras, en preorden (cada nodo antes que sus hijos)
+SUBARBOL_SQL = f"""
+    WITH RECURSIVE arbol AS (
+        SELECT IdAsignadorCompra::BIGINT AS id, NULL::BIGINT AS padre_id, 0 AS nivel,
+               ARRAY[IdAsignadorCompra::BIGINT] AS ruta
+        FROM AsignadorCompra
+        WHERE IdAsignadorCompra = %(id)s
+      UNION ALL
+        SELECT r.IdSub_Compra, r.IdCompra_Madre, a.nivel + 1, a.ruta || r.IdSub_Compra::BIGINT
+        FROM arbol a
+        JOIN Relacion_Entre_Compras r ON r.IdCompra_Madre = a.id
+        WHERE r.IdSub_Compra <> ALL(a.ruta)
+    )
+    SELECT n.id, n.padre_id, n.nivel, {_DETALLE_NODO}
+    FROM arbol n {_JOINS_NODO}
+    ORDER BY n.ruta
+"""
+
+# Compra %(id)s y todos sus ancestros, de la raíz hacia abajo. Una sub compra
+# puede estar en más de un ensamble, así que puede haber varias raíces.
+ANCESTROS_SQL = f"""
+    WITH RECURSIVE cadena AS (
+        SELECT IdAsignadorCompra::BIGINT AS id, 0 AS nivel,
+               ARRAY[IdAsignadorCompra::BIGINT] AS ruta
+        FROM AsignadorCompra
+        WHERE IdAsignadorCompra = %(id)s
+      UNION ALL
+        SELECT r.IdCompra_Madre, c.nivel + 1, c.ruta || r.IdCompra_Madre::BIGINT
+        FROM cadena c
+        JOIN Relacion_Entre_Compras r ON r.IdSub_Compra = c.id
+        WHERE r.IdCompra_Madre <> ALL(c.ruta)
+    ),
+    nodos AS (
+        -- Un ancestro alcanzable por dos caminos se informa con su distancia mayor
+        SELECT id, max(nivel) AS nivel FROM cadena GROUP BY id
+    )
+    SELECT n.id, n.nivel, {_DETALLE_NODO},
+           NOT EXISTS (SELECT 1 FROM Relacion_Entre_Compras r WHERE r.IdSub_Compra = n.id) AS es_raiz
+    FROM nodos n {_JOINS_NODO}
+    ORDER BY n.nivel DESC, n.id
+"""
+
+# Alta de un vínculo %(madre)s -> %(sub)s en una sola sentencia: las reglas se
+# evalúan en la misma consulta que inserta, las dos compras quedan bloqueadas
+# (FOR SHARE) hasta el fin de la transacción para que su usuario no cambie en
+# medio, y la restricción única resuelve dos altas simultáneas del mismo par.
+# Devuelve una fila con el id insertado, o con el motivo del rechazo:
+# misma_compra, sin_usuario, otro_usuario, madre_invalida, ciclo o existente.
+# Sin filas: alguna de las dos compras no existe.
+INSERTAR_RELACION_SQL = """
+    WITH RECURSIVE cadena AS (
+        -- Ancestros de la madre: si la sub compra está entre ellos, se cerraría un ciclo
+        SELECT %(madre)s::BIGINT AS id, ARRAY[%(madre)s::BIGINT] AS ruta
+      UNION ALL
+        SELECT r.IdCompra_Madre, c.ruta || r.IdCompra_Madre::BIGINT
+        FROM cadena c
+        JOIN Relacion_Entre_Compras r ON r.IdSub_Compra = c.id
+        WHERE r.IdCompra_Madre <> ALL(c.ruta)
+    ),
+    compras AS (
+        SELECT m.Comprado_Para AS usuario_madre,
+               s.Comprado_Para AS usuario_sub,
+               COALESCE(pm.Es_Producto_Madre, FALSE) AS madre_es_madre
+        FROM AsignadorCompra m
+        JOIN AsignadorCompra s ON s.IdAsignadorCompra = %(sub)s::BIGINT
+        LEFT JOIN Productos pm ON m.Producto = pm.IdProducto
+        WHERE m.IdAsignadorCompra = %(madre)s::BIGINT
+        FOR SHARE OF m, s
+    ),
+    validacion AS (
+        SELECT CASE
+            WHEN %(madre)s::BIGINT = %(sub)s::BIGINT THEN 'misma_compra'
+            WHEN usuario_madre IS NULL OR usuario_sub IS NULL THEN 'sin_usuario'
+            WHEN usuario_madre <> usuario_sub THEN 'otro_usuario'
+            WHEN NOT madre_es_madre THEN 'madre_invalida'
+            WHEN EXISTS (SELECT 1 FROM cadena WHERE id = %(sub)s::BIGINT) THEN 'ciclo'
+        END AS motivo
+        FROM compras
+    ),
+    insertada AS (
+        INSERT INTO Relacion_Entre_Compras (IdCompra_Madre, IdSub_Compra)
+        SELECT %(madre)s::BIGINT, %(sub)s::BIGINT FROM validacion WHERE motivo IS NULL
+        ON CONFLICT ON CONSTRAINT uq_relacion_madre_sub DO NOTHING
+        RETURNING IdRelacion_Entre_Compras AS id
+    )
+    SELECT COALESCE(v.motivo, CASE WHEN i.id IS NULL THEN 'existente' END) AS motivo, i.id
+    FROM validacion v
+    LEFT JOIN insertada i ON TRUE
+"""
+
+
+def armar_arbol(nodos):
+    """Convertir las filas de SUBARBOL_SQL (en preorden) en un árbol anidado.
+
+    Cada nodo recibe una lista 'hijos'. Se usa el nivel y no padre_id porque
+    una misma compra puede aparecer bajo dos madres dentro del subárbol.
+    """
+    raiz = None
+    pila = []
+    for fila in nodos:
+        nodo = dict(fila, hijos=[])
+        del pila[nodo['nivel']:]
+        if pila:
+            pila[-1]['hijos'].append(nodo)
+        else:
+            raiz = nodo
+        pila.append(nodo)
+    return raiz
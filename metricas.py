@@ -0,0 +1,251 @@
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# ========== MÉTRICAS Y TIEMPOS ==========
+# Contadores e histogramas en memoria del proceso, expuestos en el formato de
+# texto de Prometheus (/metrics). Con varios workers de gunicorn cada proceso
+# tiene sus propios valores; la etiqueta pid los distingue.
+#
+# registrar_consulta() acumula además los datos de la petición en curso
+# (cantidad de consultas, tiempo total en la BD y la más lenta) en un
+# ContextVar, y deja en el registro las que superan SLOW_QUERY_MS.
+
+log = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _env_float(nombre, default):
+    try:
+        return float(os.getenv(nombre, default))
+    except (TypeError, ValueError):
+        return default
+
+
+SLOW_QUERY_MS = _env_float('SLOW_QUERY_MS', 200)
+
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = list(zip(nombres, valores)) + list(extra)
+    if not pares:
+        return ''
+    texto = ','.join(f'{n}="{_escapar(v)}"' for n, v in pares)
+    return '{' + texto + '}'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador acumulado por combinación de etiquetas"""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def lineas(self, extra=()):
+        with self._lock:
+            series = sorted(self._valores.items())
+        for valores, total in series:
+            yield f'{self.nombre}{_etiquetas(self.etiquetas, valores, extra)} {_numero(total)}'
+
+
+class Histograma:
+    """Histograma con buckets fijos por combinación de etiquetas"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        self._series = {}          # valores -> [conteo por bucket (+Inf al final), suma]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            else:
+                serie[0][-1] += 1
+            serie[1] += valor
+
+    def lineas(self, extra=()):
+        with self._lock:
+            series = sorted((valores, list(conteos), suma) for valores, (conteos, suma) in self._series.items())
+        extra = tuple(extra)
+        for valores, conteos, suma in series:
+            acumulado = 0
+            for limite, cantidad in zip(self.buckets + ('+Inf',), conteos):
+                acumulado += cantidad
+                le = limite if limite == '+Inf' else _numero(float(limite))
+                yield f'{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, extra + (("le", le),))} {acumulado}'
+            yield f'{self.nombre}_sum{_etiquetas(self.etiquetas, valores, extra)} {_numero(round(suma, 6))}'
+            yield f'{self.nombre}_count{_etiquetas(self.etiquetas, valores, extra)} {acumulado}'
+
+
+PETICIONES = Contador(
+    'inventario_http_requests_total', 'Peticiones atendidas',
+    ('endpoint', 'method', 'status'))
+DURACION_PETICIONES = Histograma(
+    'inventario_http_request_duration_seconds', 'Duración de las peticiones por ruta',
+    ('endpoint', 'method'))
+CONSULTAS_POR_PETICION = Histograma(
+    'inventario_db_queries_per_request', 'Consultas SQL ejecutadas por petición',
+    ('endpoint',), buckets=BUCKETS_CONSULTAS)
+DURACION_CONSULTAS = Histograma(
+    'inventario_db_query_duration_seconds', 'Duración de cada consulta SQL')
+CONSULTAS_LENTAS = Contador(
+    'inventario_db_slow_queries_total', f'Consultas que superaron SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms)')
+FRAGMENTOS = Contador(
+    'inventario_fragment_cache_total', 'Búsquedas en la caché de fragmentos renderizados',
+    ('endpoint', 'resultado'))
+
+METRICAS = (PETICIONES, DURACION_PETICIONES, CONSULTAS_POR_PETICION, DURACION_CONSULTAS, CONSULTAS_LENTAS,
+            FRAGMENTOS)
+
+
+# ---------- Consultas de la petición en curso ----------
+class ConsultasPeticion:
+    """Consultas ejecutadas durante una petición"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.mas_lenta = 0.0
+        self.sql_mas_lenta = None
+
+    def agregar(self, sql, duracion):
+        self.cantidad += 1
+        self.tiempo += duracion
+        if duracion > self.mas_lenta:
+            self.mas_lenta = duracion
+            self.sql_mas_lenta = sql
+
+
+consultas_actuales = ContextVar('consultas_peticion', default=None)
+
+
+def iniciar_peticion():
+    """Empezar a acumular consultas; devuelve el token para terminar_peticion"""
+    return consultas_actuales.set(ConsultasPeticion())
+
+
+def terminar_peticion(token):
+    consultas_actuales.reset(token)
+
+
+def resumir_sql(sql, largo=300):
+    """SQL en una línea y recortado, para el registro"""
+    texto = re.sub(r'\s+', ' ', sql if isinstance(sql, str) else sql.decode(errors='replace')).strip()
+    return texto if len(texto) <= largo else texto[:largo] + '...'
+
+
+def registrar_consulta(sql, duracion):
+    DURACION_CONSULTAS.observar(duracion)
+    actual = consultas_actuales.get()
+    if actual is not None:
+        actual.agregar(sql, duracion)
+    if duracion * 1000 >= SLOW_QUERY_MS:
+        CONSULTAS_LENTAS.incrementar()
+        log.warning("🐢 Consulta lenta (%.1f ms)", duracion * 1000,
+                    extra={'duracion_ms': round(duracion * 1000, 1), 'sql': resumir_sql(sql)})
+
+
+@contextmanager
+def medir_consulta(sql):
+    """Medir lo que tarda el bloque y registrarlo como una consulta"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+def server_timing(consultas, total):
+    """Valor de la cabecera Server-Timing (milisegundos)"""
+    return (f'db;dur={consultas.tiempo * 1000:.1f};desc="{consultas.cantidad} consultas", '
+            f'db-max;dur={consultas.mas_lenta * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}')
+
+
+# ---------- Exposición ----------
+_GAUGES_POOL = (
+    ('open', 'Conexiones abiertas'),
+    ('in_use', 'Conexiones en uso'),
+    ('idle', 'Conexiones ociosas'),
+    ('waiting', 'Hilos esperando una conexión'),
+    ('max', 'Máximo de conexiones del pool'),
+)
+_CONTADORES_POOL = (
+    ('checkouts', 'Conexiones entregadas'),
+    ('timeouts', 'Esperas que agotaron DB_POOL_TIMEOUT'),
+    ('created', 'Conexiones abiertas desde el inicio'),
+    ('discarded', 'Conexiones cerradas o descartadas'),
+)
+
+
+def _lineas_pools(estadisticas, pid):
+    """Series de los pools a partir de ConnectionPool.stats()"""
+    for clave, ayuda in _GAUGES_POOL:
+        nombre = f'inventario_db_pool_{clave}'
+        yield f'# HELP {nombre} {ayuda}'
+        yield f'# TYPE {nombre} gauge'
+        for i, stats in enumerate(estadisticas):
+            yield f'{nombre}{_etiquetas(("pool", "pid"), (i, pid))} {stats[clave]}'
+    for clave, ayuda in _CONTADORES_POOL:
+        nombre = f'inventario_db_pool_{clave}_total'
+        yield f'# HELP {nombre} {ayuda}'
+        yield f'# TYPE {nombre} counter'
+        for i, stats in enumerate(estadisticas):
+            yield f'{nombre}{_etiquetas(("pool", "pid"), (i, pid))} {stats[clave]}'
+    nombre = 'inventario_db_pool_wait_seconds'
+    yield f'# HELP {nombre} Espera para obtener una conexión del pool'
+    yield f'# TYPE {nombre} histogram'
+    for i, stats in enumerate(estadisticas):
+        espera = stats['wait_seconds']
+        etiquetas = (("pool", i), ("pid", pid))
+        for limite, acumulado in espera['buckets'].items():
+            le = limite if limite == '+Inf' else _numero(float(limite))
+            yield f'{nombre}_bucket{_etiquetas((), (), etiquetas + (("le", le),))} {acumulado}'
+        yield f'{nombre}_sum{_etiquetas((), (), etiquetas)} {_numero(float(espera["sum"]))}'
+        yield f'{nombre}_count{_etiquetas((), (), etiquetas)} {espera["count"]}'
+
+
+def exponer(estadisticas_pools=()):
+    """Texto de /metrics (formato de exposición de Prometheus 0.0.4)"""
+    pid = os.getpid()
+    lineas = []
+    for metrica in METRICAS:
+        lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+        lineas.extend(metrica.lineas(extra=(('pid', pid),)))
+    lineas.extend(_lineas_pools(list(estadisticas_pools), pid))
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,266 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+# ========== PAGINACIÓN POR CLAVE (KEYSET / SEEK) ==========
+# En lugar de OFFSET, cada página continúa desde los valores de ordenamiento
+# de la última fila mostrada: "WHERE (col, id) > (valor, último_id) LIMIT n".
+# Con un índice sobre las columnas de ordenamiento el costo de una página no
+# depende de cuántas filas haya antes de ella.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_page_size(valor, default=DEFAULT_PAGE_SIZE):
+    try:
+        tamano = int(valor)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(tamano, MAX_PAGE_SIZE))
+
+
+def _json_default(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"Valor no serializable en el cursor: {valor!r}")
+
+
+def encode_cursor(valores):
+    """Codificar los valores de ordenamiento de una fila como token opaco para la URL"""
+    datos = json.dumps(valores, default=_json_default, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(datos).decode().rstrip('=')
+
+
+def decode_cursor(token, cantidad):
+    """Decodificar un token; devuelve None si es inválido o no corresponde al ordenamiento"""
+    if not token:
+        return None
+    try:
+        datos = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        valores = json.loads(datos)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        return None
+    return valores
+
+
+class SortKey:
+    """Columna de ordenamiento: expresión SQL, alias en el SELECT, dirección y si admite NULL"""
+
+    def __init__(self, expr, alias, direction='ASC', nullable=False):
+        self.expr = expr
+        self.alias = alias
+        self.direction = 'DESC' if direction.upper() == 'DESC' else 'ASC'
+        self.nullable = nullable
+
+    def order(self, backward=False, por_alias=False):
+        # Los NULL siempre van al final del orden visible
+        expr = self.alias if por_alias else self.expr
+        if not backward:
+            return f"{expr} {self.direction}" + (" NULLS LAST" if self.nullable else "")
+        invertida = 'ASC' if self.direction == 'DESC' else 'DESC'
+        return f"{expr} {invertida}" + (" NULLS FIRST" if self.nullable else "")
+
+
+class KeysetPaginator:
+    """Construye ORDER BY y la condición de búsqueda para una lista de SortKey.
+
+    La última clave debe ser única (normalmente la llave primaria) para que el
+    orden sea total y ninguna fila se repita o se pierda entre páginas.
+    """
+
+    def __init__(self, keys, page_size=DEFAULT_PAGE_SIZE):
+        self.keys = keys
+        self.page_size = page_size
+
+    def order_by(self, backward=False, por_alias=False):
+        return "ORDER BY " + ", ".join(k.order(backward, por_alias) for k in self.keys)
+
+    def seek(self, valores, backward=False):
+        """Ramas SQL (condición, parámetros) de las filas posteriores/anteriores a valores.
+
+        Las ramas son disjuntas y cada una se resuelve con un rango del índice:
+        un OR entre ellas ya no lo sería y obligaría a recorrer todas las filas
+        anteriores. Un orden uniforme sin NULL produce una sola rama.
+        """
+        return self._ramas(self.keys, valores, backward)
+
+    def _ramas(self, claves, valores, backward):
+        if not claves:
+            return []
+        primera, valor = claves[0], valores[0]
+        if valor is None:
+            # Desde NULL: empatar en NULL y seguir con el resto; hacia atrás
+            # quedan además todos los no nulos
+            ramas = [(f"{primera.expr} IS NULL AND {sql}", p)
+                     for sql, p in self._ramas(claves[1:], valores[1:], backward)]
+            if backward:
+                ramas.append((f"{primera.expr} IS NOT NULL", ()))
+            return ramas
+
+        # Tramo de claves con la misma dirección y sin NULL después de la
+        # primera: se compara como fila, (c1, c2) > (v1, v2)
+        n = 1
+        while (n < len(claves) and not claves[n].nullable
+               and claves[n].direction == primera.direction):
+            n += 1
+        mayor = (primera.direction == 'ASC') != backward
+        tramo = claves[:n]
+        if n == 1:
+            comparacion = f"{primera.expr} {'>' if mayor else '<'} %s"
+        else:
+            columnas = ", ".join(k.expr for k in tramo)
+            marcas = ", ".join(["%s"] * n)
+            comparacion = f"({columnas}) {'>' if mayor else '<'} ({marcas})"
+
+        ramas = []
+        if n < len(claves):
+            igualdad = " AND ".join(f"{k.expr} = %s" for k in tramo)
+            ramas.extend((f"{igualdad} AND {sql}", tuple(valores[:n]) + tuple(p))
+                         for sql, p in self._ramas(claves[n:], valores[n:], backward))
+        ramas.append((comparacion, tuple(valores[:n])))
+        if primera.nullable and not backward:
+            # Los NULL van al final: todos quedan después de un valor no nulo
+            ramas.append((f"{primera.expr} IS NULL", ()))
+        return ramas
+
+    def cursor_for(self, fila):
+        return encode_cursor([fila[k.alias] for k in self.keys])
+
+
+class Page:
+    """Resultado de una página: filas y cursores para la anterior/siguiente"""
+
+    def __init__(self, rows, page_size, next_cursor=None, prev_cursor=None):
+        self.rows = rows
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.next_url = None
+        self.prev_url = None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def escape_like(valor):
+    """Escapar los comodines de LIKE para buscar el texto literal"""
+    return valor.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class Listado:
+    """Consulta de un listado armada a partir de los parámetros de la petición.
+
+    La misma definición (base, orden y filtros) la usan la página HTML, que la
+    recorre por páginas, y las exportaciones, que la leen completa.
+    """
+
+    def __init__(self, base_query, keys, sort_by=None, sort_order=None, conditions=(), params=()):
+        self.base_query = base_query
+        self.keys = keys
+        self.sort_by = sort_by
+        self.sort_order = sort_order
+        self.conditions = list(conditions)
+        self.params = list(params)
+        # Filtros aplicados (nombre del parámetro -> valor), para la plantilla
+        self.filters = {}
+
+    def _add(self, nombre, valor, condicion, *params):
+        self.filters[nombre] = valor
+        self.conditions.append(condicion)
+        self.params.extend(params)
+
+    def filter_contains(self, nombre, expr, valor):
+        """Filtrar por subcadena sin distinguir mayúsculas.
+
+        ILIKE '%texto%' puede usar un índice GIN de pg_trgm sobre expr.
+        """
+        valor = (valor or '').strip()
+        if valor:
+            self._add(nombre, valor, f"{expr} ILIKE %s", f"%{escape_like(valor)}%")
+
+    def filter_equals(self, nombre, expr, valor):
+        if valor is not None and valor != '':
+            self._add(nombre, valor, f"{expr} = %s", valor)
+
+    def filter_choice(self, nombre, valor, opciones):
+        """Filtro de opciones fijas: opciones asocia cada valor con su condición SQL"""
+        if valor in opciones:
+            self._add(nombre, valor, opciones[valor])
+
+    def filter_range(self, nombre_desde, nombre_hasta, expr, desde=None, hasta=None):
+        """Rango cerrado [desde, hasta]; cualquiera de los extremos es opcional"""
+        if desde:
+            self._add(nombre_desde, desde, f"{expr} >= %s", desde)
+        if hasta:
+            self._add(nombre_hasta, hasta, f"{expr} <= %s", hasta)
+
+    def full_query(self):
+        """SQL (y parámetros) con todas las filas en el orden del listado, sin LIMIT"""
+        where = f"WHERE {' AND '.join(self.conditions)}" if self.conditions else ""
+        sql = f"{self.base_query}\n{where}\n{KeysetPaginator(self.keys).order_by()}"
+        return sql, tuple(self.params)
+
+
+def build_page_query(base_query, paginator, after=None, before=None, conditions=(), params=()):
+    """Armar la consulta de una página.
+
+    base_query es un SELECT ... FROM ... [JOIN ...] sin WHERE ni ORDER BY.
+    Devuelve (sql, params, backward, has_cursor): backward indica si se pidió
+    la página anterior (las filas vienen en orden inverso) y has_cursor si la
+    petición traía un cursor válido.
+    """
+    condiciones = list(conditions)
+    parametros = list(params)
+    backward = False
+    token = after
+    if before and not after:
+        backward = True
+        token = before
+    valores = decode_cursor(token, len(paginator.keys))
+    if valores is None:
+        backward = False
+        ramas = [(None, ())]
+    else:
+        ramas = paginator.seek(valores, backward) or [("FALSE", ())]
+
+    limite = paginator.page_size + 1
+    partes = []
+    parametros_ramas = []
+    for rama, p in ramas:
+        condiciones_rama = condiciones + ([rama] if rama else [])
+        where = f"WHERE {' AND '.join(condiciones_rama)}" if condiciones_rama else ""
+        partes.append(f"{base_query}\n{where}\n{paginator.order_by(backward)}\nLIMIT %s")
+        parametros_ramas.extend(parametros + list(p) + [limite])
+
+    if len(partes) == 1:
+        return partes[0], tuple(parametros_ramas), backward, valores is not None
+    # Varias ramas: cada una trae a lo sumo una página por su índice y se
+    # mezclan por los alias del SELECT
+    union = "\nUNION ALL\n".join(f"({parte})" for parte in partes)
+    sql = (f"SELECT * FROM (\n{union}\n) pagina\n"
+           f"{paginator.order_by(backward, por_alias=True)}\nLIMIT %s")
+    return sql, tuple(parametros_ramas) + (limite,), backward, True
+
+
+def make_page(rows, paginator, backward, has_cursor):
+    """Recortar las filas obtenidas (se pidió una de más) y calcular los cursores"""
+    rows = list(rows or [])
+    hay_mas = len(rows) > paginator.page_size
+    rows = rows[:paginator.page_size]
+    if backward:
+        rows.reverse()
+        prev_cursor = paginator.cursor_for(rows[0]) if hay_mas and rows else None
+        next_cursor = paginator.cursor_for(rows[-1]) if rows else None
+    else:
+        next_cursor = paginator.cursor_for(rows[-1]) if hay_mas and rows else None
+        prev_cursor = paginator.cursor_for(rows[0]) if has_cursor and rows else None
+    return Page(rows, paginator.page_size, next_cursor=next_cursor, prev_cursor=prev_cursor)
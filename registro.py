@@ -0,0 +1,160 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# ========== REGISTRO (LOGGING) ==========
+# Los mensajes se encolan en el hilo que los emite y un QueueListener los
+# escribe en stderr desde su propio hilo: la petición no espera la E/S de la
+# consola. Cada registro lleva el request_id de la petición en curso.
+#
+# Configuración por variables de entorno:
+#     LOG_LEVEL         nivel mínimo (INFO)
+#     LOG_FORMAT        json (una línea JSON por registro) o texto
+#     LOG_DEBUG_SAMPLE  fracción de los mensajes DEBUG que se conservan (1.0)
+
+request_id_actual = ContextVar('request_id', default=None)
+
+# Atributos propios de LogRecord; el resto se considera contexto (extra=...)
+_ATRIBUTOS_RECORD = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+_configuracion = {'pid': None, 'listener': None, 'handler': None}
+_lock = threading.Lock()
+
+
+def fijar_request_id(valor):
+    """Asociar un request_id al contexto actual; devuelve el token para limpiar_request_id"""
+    return request_id_actual.set(valor)
+
+
+def limpiar_request_id(token):
+    request_id_actual.reset(token)
+
+
+class _ContextoFilter(logging.Filter):
+    """Agrega request_id y descarta al azar una parte de los DEBUG.
+
+    Corre en el hilo que emite el mensaje, antes de encolarlo: lo que se
+    descarta no llega a formatearse.
+    """
+
+    def __init__(self, muestreo_debug=1.0):
+        super().__init__()
+        self.muestreo_debug = muestreo_debug
+
+    def filter(self, record):
+        if record.levelno <= logging.DEBUG and self.muestreo_debug < 1.0:
+            if random.random() >= self.muestreo_debug:
+                return False
+        record.request_id = request_id_actual.get()
+        return True
+
+
+class _ColaHandler(logging.handlers.QueueHandler):
+    """QueueHandler que conserva los campos del registro para el formateador JSON.
+
+    El de la biblioteca estándar deja en msg el texto ya formateado; aquí solo
+    se resuelven los argumentos y la traza de la excepción (que no se pueden
+    enviar a otro hilo tal cual).
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea con los campos fijos y el contexto extra"""
+
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'pid': record.process,
+        }
+        if getattr(record, 'request_id', None):
+            datos['request_id'] = record.request_id
+        for clave, valor in record.__dict__.items():
+            if clave not in _ATRIBUTOS_RECORD and not clave.startswith('_'):
+                datos[clave] = valor
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class TextoFormatter(logging.Formatter):
+    """Formato legible para consola: hora, nivel, request_id (si hay) y mensaje"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(message)s', datefmt='%H:%M:%S')
+
+    def format(self, record):
+        texto = super().format(record)
+        if getattr(record, 'request_id', None):
+            texto += f" [{record.request_id}]"
+        return texto
+
+
+def _env_float(nombre, default):
+    try:
+        return float(os.getenv(nombre, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def configurar_registro(formato='json'):
+    """Instalar el handler con cola en el logger raíz (una vez por proceso).
+
+    formato es el predeterminado si LOG_FORMAT no está definida. Tras un fork
+    se vuelve a instalar: el hilo del QueueListener no pasa al proceso hijo.
+    """
+    with _lock:
+        if _configuracion['pid'] == os.getpid():
+            return
+        raiz = logging.getLogger()
+        if _configuracion['handler'] is not None:
+            raiz.removeHandler(_configuracion['handler'])
+
+        salida = logging.StreamHandler(sys.stderr)
+        if os.getenv('LOG_FORMAT', formato).strip().lower() == 'texto':
+            salida.setFormatter(TextoFormatter())
+        else:
+            salida.setFormatter(JsonFormatter())
+
+        cola = queue.SimpleQueue()
+        handler = _ColaHandler(cola)
+        handler.addFilter(_ContextoFilter(min(1.0, max(0.0, _env_float('LOG_DEBUG_SAMPLE', 1.0)))))
+        listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+        listener.start()
+
+        raiz.addHandler(handler)
+        nivel = os.getenv('LOG_LEVEL', 'INFO').strip().upper()
+        raiz.setLevel(nivel if isinstance(logging.getLevelName(nivel), int) else logging.INFO)
+        _configuracion.update(pid=os.getpid(), listener=listener, handler=handler)
+
+
+def detener_registro():
+    """Vaciar la cola y detener el hilo escritor (se llama al salir del proceso)"""
+    with _lock:
+        listener = _configuracion['listener']
+        if listener is not None and _configuracion['pid'] == os.getpid():
+            listener.stop()
+            logging.getLogger().removeHandler(_configuracion['handler'])
+            _configuracion.update(pid=None, listener=None, handler=None)
+
+
+atexit.register(detener_registro)
@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
+import logging
 import psycopg2
 import os
 import sys
 from datetime import date
 
+try:
+    from registro import configurar_registro
+except ImportError:
+    # run.sh monta solo este archivo en un contenedor aparte
+    configurar_registro = None
+
+log = logging.getLogger('seed')
+
 def conectar_db():
     """Conectar a la base de datos desde Docker"""
     try:
-        print("🔗 Conectando a PostgreSQL...")
+        log.info("🔗 Conectando a PostgreSQL...")
         conn = psycopg2.connect(
             host=os.getenv('DB_HOST', 'postgres'),
             port=os.getenv('DB_PORT', '5432'),
@@ -15,15 +24,15 @@ def conectar_db():
             user=os.getenv('DB_USER', 'admin'),
             password=os.getenv('DB_PASSWORD', 'admin123')
         )
-        print("✅ Conexión exitosa a PostgreSQL")
+        log.info("✅ Conexión exitosa a PostgreSQL")
         return conn
     except Exception as e:
-        print(f"❌ Error de conexión: {e}")
+        log.error("❌ Error de conexión: %s", e)
         sys.exit(1)
 
 def reiniciar_base_datos(cursor):
     """Reiniciar completamente la base de datos (más agresivo)"""
-    print("🔄 Reiniciando base de datos...")
+    log.info("🔄 Reiniciando base de datos...")
     
     # Desactivar constraints temporalmente
     cursor.execute("SET session_replication_role = 'replica';")
@@ -44,13 +53,13 @@ def reiniciar_base_datos(cursor):
     for tabla in tablas:
         try:
             cursor.execute(f"TRUNCATE TABLE {tabla} CASCADE;")
-            print(f"  ✅ {tabla} truncada y secuencia reiniciada")
+            log.info("  ✅ %s truncada y secuencia reiniciada", tabla)
         except Exception as e:
-            print(f"⚠️  Error con {tabla}: {e}")
+            log.warning("⚠️  Error con %s: %s", tabla, e)
     
     # Reactivar constraints
     cursor.execute("SET session_replication_role = 'origin';")
-    print("✅ Base de datos reiniciada completamente")
+    log.info("✅ Base de datos reiniciada completamente")
 
 def insertar_categorias(cursor):
     """Insertar categorías de ejemplo"""
@@ -62,7 +71,7 @@ def insertar_categorias(cursor):
     
     for categoria in categorias:
         cursor.execute("INSERT INTO Categorias (Nombre_Categoria) VALUES (%s)", (categoria,))
-    print(f"✅ {len(categorias)} categorías insertadas")
+    log.info("✅ %s categorías insertadas", len(categorias))
 
 def insertar_proveedores(cursor):
     """Insertar proveedores de ejemplo"""
@@ -75,7 +84,7 @@ def insertar_proveedores(cursor):
     
     for proveedor in proveedores:
         cursor.execute("INSERT INTO Proveedores (Nombre) VALUES (%s)", (proveedor,))
-    print(f"✅ {len(proveedores)} proveedores insertados")
+    log.info("✅ %s proveedores insertados", len(proveedores))
 
 def insertar_ubicaciones(cursor):
     """Insertar ubicaciones de ejemplo"""
@@ -96,7 +105,7 @@ def insertar_ubicaciones(cursor):
     
     for nombre, descripcion in ubicaciones:
         cursor.execute("INSERT INTO Ubicaciones (NombreEdificio) VALUES (%s)", (nombre,))
-    print(f"✅ {len(ubicaciones)} ubicaciones insertadas")
+    log.info("✅ %s ubicaciones insertadas", len(ubicaciones))
 
 def insertar_usuarios(cursor):
     """Insertar usuarios de ejemplo usando nombres de ubicaciones"""
@@ -128,9 +137,9 @@ def insertar_usuarios(cursor):
             )
             usuarios_insertados += 1
         else:
-            print(f"⚠️  Ubicación '{nombre_ubicacion}' no encontrada para usuario {nombre}")
+            log.warning("⚠️  Ubicación '%s' no encontrada para usuario %s", nombre_ubicacion, nombre)
     
-    print(f"✅ {usuarios_insertados} usuarios insertados")
+    log.info("✅ %s usuarios insertados", usuarios_insertados)
 
 def insertar_productos(cursor):
     """Insertar productos de ejemplo"""
@@ -175,9 +184,9 @@ def insertar_productos(cursor):
             )
             productos_insertados += 1
         else:
-            print(f"⚠️  Categoría '{nombre_categoria}' no encontrada")
+            log.warning("⚠️  Categoría '%s' no encontrada", nombre_categoria)
     
-    print(f"✅ {productos_insertados} productos insertados")
+    log.info("✅ %s productos insertados", productos_insertados)
 
 def insertar_compras(cursor):
     """Insertar compras de ejemplo"""
@@ -224,9 +233,11 @@ def insertar_compras(cursor):
             )
             compras_insertadas += 1
         else:
-            print(f"⚠️  Datos faltantes: Prod={nombre_producto}({producto_id}), Prov={nombre_proveedor}({proveedor_id}), User={nombre_usuario}({usuario_id})")
+            log.warning("⚠️  Datos faltantes: Prod=%s(%s), Prov=%s(%s), User=%s(%s)",
+                        nombre_producto, producto_id, nombre_proveedor, proveedor_id,
+                        nombre_usuario, usuario_id)
     
-    print(f"✅ {compras_insertadas} compras insertadas")
+    log.info("✅ %s compras insertadas", compras_insertadas)
 
 def insertar_mantenimientos(cursor):
     """Insertar mantenimientos de ejemplo"""
@@ -253,9 +264,9 @@ def insertar_mantenimientos(cursor):
             )
             mantenimientos_insertados += 1
         else:
-            print(f"⚠️  Compra '{numero_serie}' no encontrada")
+            log.warning("⚠️  Compra '%s' no encontrada", numero_serie)
     
-    print(f"✅ {mantenimientos_insertados} mantenimientos insertados")
+    log.info("✅ %s mantenimientos insertados", mantenimientos_insertados)
 
 def insertar_relaciones(cursor):
     """Insertar relaciones entre compras de ejemplo"""
@@ -289,15 +300,40 @@ def insertar_relaciones(cursor):
                 )
                 relaciones_insertadas += 1
         else:
-            print(f"⚠️  Compras no encontradas: {num_madre}({id_madre}) -> {num_hijo}({id_hijo})")
+            log.warning("⚠️  Compras no encontradas: %s(%s) -> %s(%s)", num_madre, id_madre, num_hijo, id_hijo)
     
-    print(f"✅ {relaciones_insertadas} relaciones insertadas")
+    log.info("✅ %s relaciones insertadas", relaciones_insertadas)
+
+def actualizar_contadores(cursor):
+    """Recalcular los contadores del dashboard y los resúmenes de garantías y
+    TCO, y marcar las tablas como modificadas (los triggers no corren en modo
+    réplica)"""
+    cursor.execute("SELECT to_regproc('recalcular_contadores') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        cursor.execute("SELECT recalcular_contadores()")
+        log.info("✅ Contadores del dashboard recalculados")
+    cursor.execute("SELECT to_regproc('recalcular_resumen_garantias') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        cursor.execute("SELECT recalcular_resumen_garantias()")
+        log.info("✅ Resumen de garantías recalculado")
+    cursor.execute("SELECT to_regproc('recalcular_resumen_tco') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        cursor.execute("SELECT recalcular_resumen_tco()")
+        log.info("✅ Resumen de costo total (TCO) recalculado")
+    cursor.execute("SELECT to_regproc('marcar_tablas_modificadas') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        cursor.execute("SELECT marcar_tablas_modificadas()")
 
 def main():
     """Función principal"""
-    print("=" * 60)
-    print("🌱 SEED MEJORADO - INICIANDO")
-    print("=" * 60)
+    if configurar_registro:
+        configurar_registro(formato='texto')
+    else:
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    log.info("=" * 60)
+    log.info("🌱 SEED MEJORADO - INICIANDO")
+    log.info("=" * 60)
     
     conn = conectar_db()
     cursor = conn.cursor()
@@ -315,12 +351,13 @@ def main():
         insertar_compras(cursor)
         insertar_mantenimientos(cursor)
         insertar_relaciones(cursor)
+        actualizar_contadores(cursor)
         
         conn.commit()
         
-        print("\n" + "=" * 60)
-        print("🎉 SEED COMPLETADO EXITOSAMENTE!")
-        print("=" * 60)
+        log.info("=" * 60)
+        log.info("🎉 SEED COMPLETADO EXITOSAMENTE!")
+        log.info("=" * 60)
         
         # Resumen detallado
         cursor.execute("""
@@ -337,17 +374,15 @@ def main():
         """)
         
         for row in cursor.fetchall():
-            print(f"📊 {row[0]}: {row[1]}")
+            log.info("📊 %s: %s", row[0], row[1])
         
-        print("=" * 60)
-        print("✅ Base de datos lista!")
-        print("🌐 Accede a: http://localhost:5000")
-        print("=" * 60)
+        log.info("=" * 60)
+        log.info("✅ Base de datos lista!")
+        log.info("🌐 Accede a: http://localhost:5000")
+        log.info("=" * 60)
         
     except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Error: %s", e)
         conn.rollback()
     finally:
         cursor.close()
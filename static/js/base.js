@@ -0,0 +1,56 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const sidebarCollapse = document.getElementById('sidebarCollapse');
+    const sidebar = document.getElementById('sidebar');
+    const content = document.getElementById('content');
+
+    if (sidebarCollapse) {
+        sidebarCollapse.addEventListener('click', function() {
+            sidebar.classList.toggle('active');
+            content.classList.toggle('active');
+        });
+    }
+
+    // Marcar link activo
+    const currentPath = window.location.pathname;
+    document.querySelectorAll('#sidebar a').forEach(link => {
+        if (link.getAttribute('href') === currentPath) {
+            link.classList.add('active');
+
+            // Si el link activo está dentro del dropdown, expandirlo
+            const parentCollapse = link.closest('.collapse');
+            if (parentCollapse) {
+                parentCollapse.classList.add('show');
+                const dropdownToggle = document.querySelector('[data-bs-target="#' + parentCollapse.id + '"]');
+                if (dropdownToggle) {
+                    dropdownToggle.setAttribute('aria-expanded', 'true');
+                }
+            }
+        }
+    });
+
+    // Formularios de filtros: se envían por GET al servidor
+    document.querySelectorAll('form.filtros-form').forEach(form => {
+        // Los selects y fechas aplican el filtro al cambiar; los textos con Enter o "Buscar"
+        form.addEventListener('change', function(e) {
+            if (e.target.matches('select, input[type="date"]')) {
+                form.requestSubmit ? form.requestSubmit() : form.submit();
+            }
+        });
+
+        // No enviar campos vacíos para que la URL quede limpia
+        form.addEventListener('submit', function() {
+            form.querySelectorAll('input[name], select[name]').forEach(campo => {
+                if (campo.value === '') {
+                    campo.disabled = true;
+                }
+            });
+        });
+    });
+});
+
+// Al volver con el botón "atrás" el formulario puede quedar con campos deshabilitados
+window.addEventListener('pageshow', function() {
+    document.querySelectorAll('form.filtros-form [disabled]').forEach(campo => {
+        campo.disabled = false;
+    });
+});
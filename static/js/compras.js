@@ -0,0 +1,779 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // URLs que arma el servidor (bloque datos-pagina de compras.html)
+    const datosPagina = JSON.parse(document.getElementById('datos-pagina').textContent);
+
+    // --- BÚSQUEDAS EN EL SERVIDOR ---
+    // Los modales piden sus datos a /buscar/<catalogo> al abrirse y al escribir,
+    // de a una página; la página de compras no incluye los catálogos
+    const URL_BUSCAR = datosPagina.urlBuscar;
+
+    function buscarCatalogo(catalogo, parametros = {}) {
+        const query = new URLSearchParams();
+        Object.entries(parametros).forEach(([clave, valor]) => {
+            if (valor !== '' && valor !== null && valor !== undefined) {
+                query.set(clave, valor);
+            }
+        });
+        return fetch(URL_BUSCAR.replace('CATALOGO', catalogo) + '?' + query.toString(), {
+            headers: { 'Accept': 'application/json' }
+        }).then(respuesta => {
+            if (!respuesta.ok) {
+                throw new Error(`HTTP ${respuesta.status}`);
+            }
+            return respuesta.json();
+        });
+    }
+
+    // Esperar a que el usuario deje de escribir antes de consultar
+    function conRetraso(funcion, espera = 250) {
+        let temporizador = null;
+        return function(...args) {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(() => funcion.apply(this, args), espera);
+        };
+    }
+
+    // Fila "Mostrar más" al final de la tabla cuando hay otra página
+    function agregarFilaMas(tbody, columnas, cargarMas) {
+        const fila = document.createElement('tr');
+        fila.className = 'fila-mostrar-mas';
+        fila.innerHTML = `
+            <td colspan="${columnas}" class="text-center">
+                <button type="button" class="btn btn-sm btn-outline-secondary">
+                    <i class="bi bi-chevron-down"></i> Mostrar más
+                </button>
+            </td>
+        `;
+        fila.querySelector('button').addEventListener('click', function(e) {
+            e.preventDefault();
+            this.disabled = true;
+            cargarMas();
+        });
+        tbody.appendChild(fila);
+    }
+
+    function quitarFilaMas(tbody) {
+        tbody.querySelectorAll('.fila-mostrar-mas').forEach(fila => fila.remove());
+    }
+
+    // Llenar un select de filtro con un catálogo la primera vez que se abre el modal
+    function llenarSelectCatalogo(select, catalogo) {
+        if (select.dataset.cargado) return;
+        select.dataset.cargado = 'true';
+        buscarCatalogo(catalogo, { limit: 100 }).then(datos => {
+            datos.items.forEach(item => {
+                const option = document.createElement('option');
+                option.value = item.id;
+                option.textContent = item.nombre;
+                select.appendChild(option);
+            });
+        }).catch(error => {
+            delete select.dataset.cargado;
+            console.error(`❌ Error cargando ${catalogo}:`, error);
+        });
+    }
+
+    // Efectos de las filas de los modales: doble clic selecciona, hover resalta
+    function prepararFilaModal(fila, selectorBoton) {
+        fila.style.cursor = 'pointer';
+        fila.style.transition = 'background-color 0.2s';
+
+        fila.addEventListener('dblclick', function(e) {
+            e.preventDefault();
+            const btn = fila.querySelector(selectorBoton);
+            btn.click();
+            // Efecto visual
+            fila.style.backgroundColor = '#d4edda';
+            setTimeout(() => {
+                fila.style.backgroundColor = '';
+            }, 300);
+        });
+
+        fila.addEventListener('mouseenter', function() {
+            this.style.backgroundColor = '#f8f9fa';
+        });
+
+        fila.addEventListener('mouseleave', function() {
+            this.style.backgroundColor = '';
+        });
+    }
+
+    // Variables para rastrear cuál fila abrió cada modal
+    let filaProductoActual = null;
+    let filaProveedorActual = null;
+    let filaUsuarioActual = null;
+    let filaProductoPadreActual = null;
+
+    // --- MODAL DE PRODUCTOS ---
+    const modalProductos = new bootstrap.Modal(document.getElementById('modalProductos'));
+    const searchProductos = document.getElementById('searchProductos');
+    const filterCategoria = document.getElementById('filterCategoria');
+    const filterTipoProducto = document.getElementById('filterTipoProducto');
+    const productosTableBody = document.getElementById('productosTableBody');
+    const sinResultadosProductos = document.getElementById('sinResultadosProductos');
+    // Solo se pinta la respuesta de la última búsqueda
+    let busquedaProductos = 0;
+
+    function seleccionarProducto(e) {
+        e.preventDefault();
+        const productoId = this.dataset.id;
+        const productoNombre = this.dataset.nombre;
+
+        if (filaProductoActual) {
+            const inputOculto = filaProductoActual.querySelector('input[name="producto[]"]');
+            inputOculto.value = productoId;
+
+            const inputVisible = filaProductoActual.querySelector('input[data-producto-display]');
+            inputVisible.value = productoNombre;
+
+            filaProductoActual.dataset.productoSeleccionado = 'true';
+        }
+
+        modalProductos.hide();
+        filaProductoActual = null;
+    }
+
+    function llenarTablaProductos(filtro = '', categoria = '', tipo = '', offset = 0) {
+        const busqueda = ++busquedaProductos;
+
+        buscarCatalogo('productos', { q: filtro, categoria: categoria, tipo: tipo, offset: offset }).then(datos => {
+            if (busqueda !== busquedaProductos) return;
+            if (offset === 0) {
+                productosTableBody.innerHTML = '';
+                sinResultadosProductos.style.display = 'none';
+            }
+            quitarFilaMas(productosTableBody);
+
+            if (datos.items.length === 0 && offset === 0) {
+                sinResultadosProductos.style.display = 'block';
+                return;
+            }
+
+            datos.items.forEach(producto => {
+                const fila = document.createElement('tr');
+                const tipoProducto = producto.es_madre ? 'Producto Madre' : 'Componente/Hijo';
+                const claseBadgeTipo = producto.es_madre ? 'bg-warning text-dark' : 'bg-info';
+                const claseBadgeCategoria = 'bg-secondary';
+
+                fila.innerHTML = `
+                    <td>
+                        <i class="bi ${producto.es_madre ? 'bi-cpu' : 'bi-memory'} text-success"></i>
+                        <strong>${producto.nombre}</strong>
+                    </td>
+                    <td class="text-center">
+                        <span class="badge ${claseBadgeCategoria}">${producto.categoria_nombre || 'S/C'}</span>
+                    </td>
+                    <td class="text-center">
+                        <span class="badge ${claseBadgeTipo}">${tipoProducto}</span>
+                    </td>
+                    <td class="text-center">
+                        <button type="button" class="btn btn-sm btn-success btn-seleccionar-producto" data-id="${producto.id}" data-nombre="${producto.nombre}" data-es-madre="${producto.es_madre}">
+                            <i class="bi bi-check-circle"></i> Seleccionar
+                        </button>
+                    </td>
+                `;
+
+                prepararFilaModal(fila, '.btn-seleccionar-producto');
+                fila.querySelector('.btn-seleccionar-producto').addEventListener('click', seleccionarProducto);
+                productosTableBody.appendChild(fila);
+            });
+
+            if (datos.has_more) {
+                agregarFilaMas(productosTableBody, 4, () => llenarTablaProductos(filtro, categoria, tipo, offset + datos.items.length));
+            }
+        }).catch(error => {
+            console.error('❌ Error buscando productos:', error);
+            if (busqueda === busquedaProductos && offset === 0) {
+                productosTableBody.innerHTML = '';
+                sinResultadosProductos.style.display = 'block';
+            }
+        });
+    }
+
+    function filtrarProductos() {
+        llenarTablaProductos(searchProductos.value, filterCategoria.value, filterTipoProducto.value);
+    }
+
+    searchProductos.addEventListener('input', conRetraso(filtrarProductos));
+    filterCategoria.addEventListener('change', filtrarProductos);
+    filterTipoProducto.addEventListener('change', filtrarProductos);
+
+    document.getElementById('modalProductos').addEventListener('show.bs.modal', function() {
+        llenarSelectCatalogo(filterCategoria, 'categorias');
+        searchProductos.value = '';
+        filterCategoria.value = '';
+        filterTipoProducto.value = '';
+        searchProductos.focus();
+        llenarTablaProductos();
+    });
+
+    // --- MODAL DE PROVEEDORES ---
+    const modalProveedores = new bootstrap.Modal(document.getElementById('modalProveedores'));
+    const searchProveedores = document.getElementById('searchProveedores');
+    const proveedoresTableBody = document.getElementById('proveedoresTableBody');
+    const sinResultadosProveedores = document.getElementById('sinResultadosProveedores');
+    let busquedaProveedores = 0;
+
+    function seleccionarProveedor(e) {
+        e.preventDefault();
+        const proveedorId = this.dataset.id;
+        const proveedorNombre = this.dataset.nombre;
+
+        if (filaProveedorActual) {
+            const inputOculto = filaProveedorActual.querySelector('input[name="proveedor[]"]');
+            inputOculto.value = proveedorId;
+
+            const inputVisible = filaProveedorActual.querySelector('input[data-proveedor-display]');
+            inputVisible.value = proveedorNombre;
+
+            filaProveedorActual.dataset.proveedorSeleccionado = 'true';
+        }
+
+        modalProveedores.hide();
+        filaProveedorActual = null;
+    }
+
+    function llenarTablaProveedores(filtro = '', offset = 0) {
+        const busqueda = ++busquedaProveedores;
+
+        buscarCatalogo('proveedores', { q: filtro, offset: offset }).then(datos => {
+            if (busqueda !== busquedaProveedores) return;
+            if (offset === 0) {
+                proveedoresTableBody.innerHTML = '';
+                sinResultadosProveedores.style.display = 'none';
+            }
+            quitarFilaMas(proveedoresTableBody);
+
+            if (datos.items.length === 0 && offset === 0) {
+                sinResultadosProveedores.style.display = 'block';
+                return;
+            }
+
+            datos.items.forEach(proveedor => {
+                const fila = document.createElement('tr');
+                fila.innerHTML = `
+                    <td>
+                        <i class="bi bi-building text-primary"></i>
+                        <strong>${proveedor.nombre}</strong>
+                    </td>
+                    <td class="text-center">
+                        <button type="button" class="btn btn-sm btn-primary btn-seleccionar-proveedor" data-id="${proveedor.id}" data-nombre="${proveedor.nombre}">
+                            <i class="bi bi-check-circle"></i> Seleccionar
+                        </button>
+                    </td>
+                `;
+
+                prepararFilaModal(fila, '.btn-seleccionar-proveedor');
+                fila.querySelector('.btn-seleccionar-proveedor').addEventListener('click', seleccionarProveedor);
+                proveedoresTableBody.appendChild(fila);
+            });
+
+            if (datos.has_more) {
+                agregarFilaMas(proveedoresTableBody, 2, () => llenarTablaProveedores(filtro, offset + datos.items.length));
+            }
+        }).catch(error => {
+            console.error('❌ Error buscando proveedores:', error);
+            if (busqueda === busquedaProveedores && offset === 0) {
+                proveedoresTableBody.innerHTML = '';
+                sinResultadosProveedores.style.display = 'block';
+            }
+        });
+    }
+
+    searchProveedores.addEventListener('input', conRetraso(function() {
+        llenarTablaProveedores(searchProveedores.value);
+    }));
+
+    document.getElementById('modalProveedores').addEventListener('show.bs.modal', function() {
+        searchProveedores.value = '';
+        searchProveedores.focus();
+        llenarTablaProveedores();
+    });
+
+    // --- MODAL DE USUARIOS ---
+    const modalUsuarios = new bootstrap.Modal(document.getElementById('modalUsuarios'));
+    const searchUsuarios = document.getElementById('searchUsuarios');
+    const filterUbicacionUsuario = document.getElementById('filterUbicacionUsuario');
+    const usuariosTableBody = document.getElementById('usuariosTableBody');
+    const sinResultadosUsuarios = document.getElementById('sinResultadosUsuarios');
+    let busquedaUsuarios = 0;
+
+    function seleccionarUsuario(e) {
+        e.preventDefault();
+        const usuarioId = this.dataset.id;
+        const usuarioNombre = this.dataset.nombre;
+
+        if (filaUsuarioActual) {
+            const inputOculto = filaUsuarioActual.querySelector('input[name="comprado_para[]"]');
+            inputOculto.value = usuarioId;
+
+            const inputVisible = filaUsuarioActual.querySelector('input[data-usuario-display]');
+            inputVisible.value = usuarioNombre;
+
+            const productoPadreInput = filaUsuarioActual.querySelector('input[name="producto_padre[]"]');
+            const productoPadreDisplay = filaUsuarioActual.querySelector('input[data-producto-padre-display]');
+
+            if (productoPadreInput && productoPadreDisplay) {
+                productoPadreInput.value = '';
+                productoPadreDisplay.value = '';
+            }
+
+            filaUsuarioActual.dataset.usuarioSeleccionado = 'true';
+        }
+
+        modalUsuarios.hide();
+        filaUsuarioActual = null;
+    }
+
+    function agregarFilaSinAsignar() {
+        const filasinAsignar = document.createElement('tr');
+        filasinAsignar.innerHTML = `
+            <td>
+                <i class="bi bi-person-slash text-warning"></i>
+                <strong>Sin asignar</strong>
+            </td>
+            <td class="text-center">
+                <span class="badge bg-danger">N/A</span>
+            </td>
+            <td class="text-center">
+                <button type="button" class="btn btn-sm btn-warning btn-seleccionar-usuario" data-id="" data-nombre="Sin asignar">
+                    <i class="bi bi-check-circle"></i> Seleccionar
+                </button>
+            </td>
+        `;
+
+        // Doble clic para "Sin asignar"
+        prepararFilaModal(filasinAsignar, '.btn-seleccionar-usuario');
+        filasinAsignar.querySelector('.btn-seleccionar-usuario').addEventListener('click', seleccionarUsuario);
+        usuariosTableBody.appendChild(filasinAsignar);
+    }
+
+    function llenarTablaUsuarios(filtro = '', ubicacion = '', offset = 0) {
+        const busqueda = ++busquedaUsuarios;
+
+        buscarCatalogo('usuarios', { q: filtro, ubicacion: ubicacion, offset: offset }).then(datos => {
+            if (busqueda !== busquedaUsuarios) return;
+            if (offset === 0) {
+                usuariosTableBody.innerHTML = '';
+                sinResultadosUsuarios.style.display = 'none';
+                agregarFilaSinAsignar();
+            }
+            quitarFilaMas(usuariosTableBody);
+
+            datos.items.forEach(usuario => {
+                const fila = document.createElement('tr');
+                fila.innerHTML = `
+                    <td>
+                        <i class="bi bi-person-circle text-info"></i>
+                        <strong>${usuario.nombre}</strong>
+                    </td>
+                    <td class="text-center">
+                        <span class="badge bg-secondary">${usuario.ubicacion_nombre || 'S/U'}</span>
+                    </td>
+                    <td class="text-center">
+                        <button type="button" class="btn btn-sm btn-info btn-seleccionar-usuario" data-id="${usuario.id}" data-nombre="${usuario.nombre}">
+                            <i class="bi bi-check-circle"></i> Seleccionar
+                        </button>
+                    </td>
+                `;
+
+                // Doble clic para cada usuario
+                prepararFilaModal(fila, '.btn-seleccionar-usuario');
+                fila.querySelector('.btn-seleccionar-usuario').addEventListener('click', seleccionarUsuario);
+                usuariosTableBody.appendChild(fila);
+            });
+
+            if (datos.has_more) {
+                agregarFilaMas(usuariosTableBody, 3, () => llenarTablaUsuarios(filtro, ubicacion, offset + datos.items.length));
+            }
+        }).catch(error => {
+            console.error('❌ Error buscando usuarios:', error);
+            if (busqueda === busquedaUsuarios && offset === 0) {
+                usuariosTableBody.innerHTML = '';
+                agregarFilaSinAsignar();
+                sinResultadosUsuarios.style.display = 'block';
+            }
+        });
+    }
+
+    function filtrarUsuarios() {
+        llenarTablaUsuarios(searchUsuarios.value, filterUbicacionUsuario.value);
+    }
+
+    searchUsuarios.addEventListener('input', conRetraso(filtrarUsuarios));
+    filterUbicacionUsuario.addEventListener('change', filtrarUsuarios);
+
+    document.getElementById('modalUsuarios').addEventListener('show.bs.modal', function() {
+        llenarSelectCatalogo(filterUbicacionUsuario, 'ubicaciones');
+        searchUsuarios.value = '';
+        filterUbicacionUsuario.value = '';
+        searchUsuarios.focus();
+        llenarTablaUsuarios();
+    });
+
+    // --- MODAL DE PRODUCTO PADRE ---
+    const modalProductoPadre = new bootstrap.Modal(document.getElementById('modalProductoPadre'));
+    const productoPadreTableBody = document.getElementById('productoPadreTableBody');
+    const sinResultadosProductoPadre = document.getElementById('sinResultadosProductoPadre');
+    let busquedaProductoPadre = 0;
+
+    function seleccionarProductoPadre(e) {
+        e.preventDefault();
+        const productoId = this.dataset.id;
+        const productoNombre = this.dataset.nombre;
+
+        if (filaProductoPadreActual) {
+            const inputOculto = filaProductoPadreActual.querySelector('input[name="producto_padre[]"]');
+            inputOculto.value = productoId;
+
+            const inputVisible = filaProductoPadreActual.querySelector('input[data-producto-padre-display]');
+            inputVisible.value = productoNombre;
+
+            filaProductoPadreActual.dataset.productoPadreSeleccionado = 'true';
+        }
+
+        modalProductoPadre.hide();
+        filaProductoPadreActual = null;
+    }
+
+    function mostrarAvisoProductoPadre(html, clase) {
+        sinResultadosProductoPadre.style.display = 'block';
+        const alertDiv = sinResultadosProductoPadre.querySelector('.alert');
+        alertDiv.innerHTML = html;
+        alertDiv.className = clase;
+    }
+
+    function llenarTablaProductoPadre(usuarioId, offset = 0) {
+        const busqueda = ++busquedaProductoPadre;
+
+        if (offset === 0) {
+            productoPadreTableBody.innerHTML = '';
+            sinResultadosProductoPadre.style.display = 'none';
+
+            const filaSinVincular = document.createElement('tr');
+            filaSinVincular.innerHTML = `
+                <td>
+                    <i class="bi bi-x-circle text-danger"></i>
+                    <strong>Sin vincular</strong>
+                </td>
+                <td class="text-center">
+                    <span class="badge bg-secondary">N/A</span>
+                </td>
+                <td class="text-center">
+                    <span class="badge bg-secondary">-</span>
+                </td>
+                <td class="text-center">
+                    <button type="button" class="btn btn-sm btn-danger btn-seleccionar-producto-padre" data-id="" data-nombre="Sin vincular">
+                        <i class="bi bi-check-circle"></i> Seleccionar
+                    </button>
+                </td>
+            `;
+
+            // Doble clic para "Sin vincular"
+            prepararFilaModal(filaSinVincular, '.btn-seleccionar-producto-padre');
+            filaSinVincular.querySelector('.btn-seleccionar-producto-padre').addEventListener('click', seleccionarProductoPadre);
+            productoPadreTableBody.appendChild(filaSinVincular);
+        }
+
+        if (!usuarioId || usuarioId === '' || usuarioId === 'undefined' || usuarioId === 'null') {
+            mostrarAvisoProductoPadre('<i class="bi bi-info-circle"></i> Debe seleccionar un usuario primero', 'alert alert-info');
+            return;
+        }
+
+        const usuarioIdNum = parseInt(usuarioId);
+
+        if (isNaN(usuarioIdNum)) {
+            mostrarAvisoProductoPadre('<i class="bi bi-exclamation-triangle"></i> Error: Usuario ID inválido', 'alert alert-danger');
+            return;
+        }
+
+        buscarCatalogo('compras_madre', { usuario: usuarioIdNum, offset: offset }).then(datos => {
+            if (busqueda !== busquedaProductoPadre) return;
+            quitarFilaMas(productoPadreTableBody);
+
+            if (datos.items.length === 0 && offset === 0) {
+                mostrarAvisoProductoPadre('<i class="bi bi-exclamation-triangle"></i> No hay productos padres para este usuario', 'alert alert-warning');
+                return;
+            }
+
+            datos.items.forEach((producto) => {
+                const fila = document.createElement('tr');
+                fila.innerHTML = `
+                    <td>
+                        <i class="bi bi-cpu text-success"></i>
+                        <strong>${producto.nombre}</strong>
+                    </td>
+                    <td class="text-center">
+                        <span class="badge bg-info">${producto.usuario_nombre || 'S/usuario'}</span>
+                    </td>
+                    <td class="text-center">
+                        <span class="badge bg-secondary">${producto.numero_serie || 'S/serie'}</span>
+                    </td>
+                    <td class="text-center">
+                        <button type="button" class="btn btn-sm btn-warning btn-seleccionar-producto-padre" data-id="${producto.id}" data-nombre="${producto.nombre}${producto.numero_serie ? ' (' + producto.numero_serie + ')' : ''}">
+                            <i class="bi bi-check-circle"></i> Seleccionar
+                        </button>
+                    </td>
+                `;
+
+                // Doble clic para cada producto padre
+                prepararFilaModal(fila, '.btn-seleccionar-producto-padre');
+                fila.querySelector('.btn-seleccionar-producto-padre').addEventListener('click', seleccionarProductoPadre);
+                productoPadreTableBody.appendChild(fila);
+            });
+
+            if (datos.has_more) {
+                agregarFilaMas(productoPadreTableBody, 4, () => llenarTablaProductoPadre(usuarioId, offset + datos.items.length));
+            }
+        }).catch(error => {
+            console.error('❌ Error buscando productos padre:', error);
+            if (busqueda === busquedaProductoPadre) {
+                mostrarAvisoProductoPadre('<i class="bi bi-exclamation-triangle"></i> No se pudieron cargar los productos padres', 'alert alert-danger');
+            }
+        });
+    }
+
+    // --- CREACIÓN DINÁMICA DE FILAS ---
+    function crearFilaCompra() {
+        const fila = document.createElement('tr');
+        fila.className = 'fila-compra';
+
+        const hoy = new Date().toISOString().split('T')[0];
+
+        fila.innerHTML = `
+            <td>
+                <input type="date" class="form-control form-control-sm" name="fecha_compra[]" value="${hoy}" required>
+            </td>
+            <td>
+                <div class="input-group input-group-sm">
+                    <input type="hidden" name="producto[]" value="">
+                    <input type="text" class="form-control" data-producto-display placeholder="Seleccionar producto..." readonly style="background-color: #f8f9fa; cursor: pointer;">
+                    <button class="btn btn-outline-success btn-abrir-modal-producto" type="button" title="Abrir selector de producto">
+                        <i class="bi bi-search"></i>
+                    </button>
+                </div>
+            </td>
+            <td>
+                <div class="input-group input-group-sm">
+                    <input type="hidden" name="proveedor[]" value="">
+                    <input type="text" class="form-control" data-proveedor-display placeholder="Seleccionar proveedor..." readonly style="background-color: #f8f9fa; cursor: pointer;">
+                    <button class="btn btn-outline-primary btn-abrir-modal-proveedor" type="button" title="Abrir selector de proveedor">
+                        <i class="bi bi-search"></i>
+                    </button>
+                </div>
+            </td>
+            <td>
+                <input type="date" class="form-control form-control-sm" name="fin_garantia[]">
+            </td>
+            <td>
+                <div class="input-group input-group-sm">
+                    <input type="hidden" name="comprado_para[]" value="">
+                    <input type="text" class="form-control" data-usuario-display placeholder="Usuario sin asignar" readonly style="background-color: #f8f9fa; cursor: pointer;">
+                    <button class="btn btn-outline-info btn-abrir-modal-usuario" type="button" title="Abrir selector de usuario">
+                        <i class="bi bi-search"></i>
+                    </button>
+                </div>
+            </td>
+            <td>
+                <input type="text" class="form-control form-control-sm" name="numero_serie[]" placeholder="Opcional">
+            </td>
+            <td>
+                <div class="input-group input-group-sm">
+                    <input type="hidden" name="producto_padre[]" value="">
+                    <input type="text" class="form-control" data-producto-padre-display placeholder="Sin vincular" readonly style="background-color: #f8f9fa; cursor: pointer;">
+                    <button class="btn btn-outline-warning btn-abrir-modal-producto-padre" type="button" title="Abrir selector de producto padre">
+                        <i class="bi bi-search"></i>
+                    </button>
+                </div>
+            </td>
+            <td class="text-center">
+                <button type="button" class="btn btn-danger btn-sm btn-eliminar-fila">
+                    <i class="bi bi-trash"></i>
+                </button>
+            </td>
+        `;
+
+        fila.querySelector('.btn-abrir-modal-producto').addEventListener('click', function(e) {
+            e.preventDefault();
+            filaProductoActual = fila;
+            modalProductos.show();
+        });
+
+        fila.querySelector('input[data-producto-display]').addEventListener('click', function(e) {
+            e.preventDefault();
+            filaProductoActual = fila;
+            modalProductos.show();
+        });
+
+        fila.querySelector('.btn-abrir-modal-proveedor').addEventListener('click', function(e) {
+            e.preventDefault();
+            filaProveedorActual = fila;
+            modalProveedores.show();
+        });
+
+        fila.querySelector('input[data-proveedor-display]').addEventListener('click', function(e) {
+            e.preventDefault();
+            filaProveedorActual = fila;
+            modalProveedores.show();
+        });
+
+        fila.querySelector('.btn-abrir-modal-usuario').addEventListener('click', function(e) {
+            e.preventDefault();
+            filaUsuarioActual = fila;
+            modalUsuarios.show();
+        });
+
+        fila.querySelector('input[data-usuario-display]').addEventListener('click', function(e) {
+            e.preventDefault();
+            filaUsuarioActual = fila;
+            modalUsuarios.show();
+        });
+
+        fila.querySelector('.btn-abrir-modal-producto-padre').addEventListener('click', function(e) {
+            e.preventDefault();
+
+            const inputOculto = fila.querySelector('input[name="comprado_para[]"]');
+            const usuarioId = inputOculto ? inputOculto.value : '';
+
+            if (!usuarioId || usuarioId === '') {
+                alert('⚠️ Debe seleccionar un usuario primero antes de vincular a un producto padre');
+                return;
+            }
+
+            filaProductoPadreActual = fila;
+            llenarTablaProductoPadre(usuarioId);
+            modalProductoPadre.show();
+        });
+
+        fila.querySelector('input[data-producto-padre-display]').addEventListener('click', function(e) {
+            e.preventDefault();
+
+            const inputOculto = fila.querySelector('input[name="comprado_para[]"]');
+            const usuarioId = inputOculto ? inputOculto.value : '';
+
+            if (!usuarioId || usuarioId === '') {
+                alert('⚠️ Debe seleccionar un usuario primero antes de vincular a un producto padre');
+                return;
+            }
+
+            filaProductoPadreActual = fila;
+            llenarTablaProductoPadre(usuarioId);
+            modalProductoPadre.show();
+        });
+
+        fila.querySelector('.btn-eliminar-fila').addEventListener('click', function(e) {
+            e.preventDefault();
+            if (document.querySelectorAll('#comprasBody tr').length > 1) {
+                fila.remove();
+            } else {
+                alert('Debe haber al menos una fila en la tabla');
+            }
+        });
+
+        document.getElementById('comprasBody').appendChild(fila);
+    }
+
+    document.getElementById('agregarFilaCompra').addEventListener('click', function(e) {
+        e.preventDefault();
+        crearFilaCompra();
+    });
+
+    crearFilaCompra();
+
+    document.getElementById('formCompras').addEventListener('submit', function(e) {
+        const filas = document.querySelectorAll('#comprasBody tr');
+
+        if (filas.length === 0) {
+            e.preventDefault();
+            alert('Debe agregar al menos una compra');
+            return false;
+        }
+
+        let filasValidas = 0;
+        let filasInvalidas = [];
+
+        filas.forEach((fila, index) => {
+            const fecha = fila.querySelector('input[name="fecha_compra[]"]').value;
+            const productoInput = fila.querySelector('input[name="producto[]"]').value;
+            const proveedorInput = fila.querySelector('input[name="proveedor[]"]').value;
+            const productoDisplay = fila.querySelector('input[data-producto-display]').value;
+            const proveedorDisplay = fila.querySelector('input[data-proveedor-display]').value;
+
+            if (fecha && productoInput && productoDisplay && proveedorInput && proveedorDisplay) {
+                filasValidas++;
+            } else {
+                const numeroFila = index + 1;
+                let errores = [];
+                if (!fecha) errores.push('Fecha');
+                if (!productoInput || !productoDisplay) errores.push('Producto');
+                if (!proveedorInput || !proveedorDisplay) errores.push('Proveedor');
+                filasInvalidas.push(`Fila ${numeroFila}: ${errores.join(', ')}`);
+            }
+        });
+
+        if (filasValidas === 0) {
+            e.preventDefault();
+            let mensajeError = 'No se puede guardar. Errores encontrados:\n\n';
+            mensajeError += filasInvalidas.join('\n');
+            alert(mensajeError);
+            return false;
+        }
+
+        if (filasInvalidas.length > 0) {
+            e.preventDefault();
+            let mensajeError = `Se encontraron ${filasInvalidas.length} fila(s) incompleta(s). Por favor corrígelas antes de guardar.\n\n`;
+            mensajeError += filasInvalidas.join('\n');
+            alert(mensajeError);
+            return false;
+        }
+
+        console.log('Enviando', filasValidas, 'compra(s) válida(s)');
+    });
+
+    document.getElementById('btnLimpiar').addEventListener('click', function(e) {
+        e.preventDefault();
+        document.getElementById('comprasBody').innerHTML = '';
+        crearFilaCompra();
+    });
+
+    // --- LÓGICA DE DROPDOWNS DEPENDIENTES EN FILTROS ---
+    const filterUbicacion = document.getElementById('filterUbicacion');
+    const filterUsuario = document.getElementById('filterUsuario');
+
+    // Usuarios de la ubicación elegida, pedidos al servidor la primera vez que se usa el select
+    function cargarUsuariosFiltro() {
+        if (filterUsuario.dataset.cargado) return;
+        filterUsuario.dataset.cargado = 'true';
+        const seleccionado = filterUsuario.value;
+
+        buscarCatalogo('usuarios', { ubicacion: filterUbicacion.value, limit: 100 }).then(datos => {
+            filterUsuario.querySelectorAll('option:not([value=""])').forEach(option => option.remove());
+            datos.items.forEach(usuario => {
+                const option = document.createElement('option');
+                option.value = usuario.id;
+                option.textContent = usuario.nombre;
+                filterUsuario.appendChild(option);
+            });
+            if (datos.has_more) {
+                const option = document.createElement('option');
+                option.disabled = true;
+                option.textContent = 'Hay más usuarios: elija una ubicación';
+                filterUsuario.appendChild(option);
+            }
+            // Conservar el usuario del filtro aplicado si sigue en la lista
+            const existe = Array.from(filterUsuario.options).some(opt => opt.value === seleccionado);
+            filterUsuario.value = existe ? seleccionado : '';
+        }).catch(error => {
+            delete filterUsuario.dataset.cargado;
+            console.error('❌ Error cargando usuarios:', error);
+        });
+    }
+
+    filterUsuario.addEventListener('focus', cargarUsuariosFiltro);
+    filterUsuario.addEventListener('mousedown', cargarUsuariosFiltro);
+
+    // Al cambiar de ubicación el usuario elegido puede no pertenecer a ella
+    filterUbicacion.addEventListener('change', function() {
+        filterUsuario.value = '';
+    });
+});
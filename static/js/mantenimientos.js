@@ -0,0 +1,219 @@
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('✅ Script de mantenimientos cargado');
+
+    // URL que arma el servidor (bloque datos-pagina de mantenimientos.html)
+    const datosPagina = JSON.parse(document.getElementById('datos-pagina').textContent);
+
+    // --- MANEJO DE SELECCIÓN DE COMPRA CON FILTROS ---
+    // Las compras se piden al servidor de a una página, filtradas allá;
+    // la página de mantenimientos no incluye el catálogo de compras
+    const URL_BUSCAR = datosPagina.urlBuscar;
+    const filterUbicacionCompra = document.getElementById('filterUbicacionCompra');
+    const filterUsuarioCompra = document.getElementById('filterUsuarioCompra');
+    const searchCompra = document.getElementById('searchCompra');
+    const compraInput = document.getElementById('compra');
+    const compraSeleccionadaAlert = document.getElementById('compraSeleccionadaAlert');
+    const compraSeleccionadaTexto = document.getElementById('compraSeleccionadaTexto');
+    const comprasEncontradas = document.getElementById('comprasEncontradas');
+    const tablaCompras = document.getElementById('tablaComprasMantenimiento');
+    // Solo se pinta la respuesta de la última búsqueda
+    let busquedaCompras = 0;
+
+    function escaparHtml(texto) {
+        const div = document.createElement('div');
+        div.textContent = texto == null ? '' : String(texto);
+        return div.innerHTML;
+    }
+
+    // Esperar a que el usuario deje de escribir antes de consultar
+    function conRetraso(funcion, espera = 250) {
+        let temporizador = null;
+        return function(...args) {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(() => funcion.apply(this, args), espera);
+        };
+    }
+
+    function buscarCompras(parametros) {
+        const query = new URLSearchParams();
+        Object.entries(parametros).forEach(([clave, valor]) => {
+            if (valor !== '' && valor !== null && valor !== undefined) {
+                query.set(clave, valor);
+            }
+        });
+        return fetch(URL_BUSCAR + '?' + query.toString(), {
+            headers: { 'Accept': 'application/json' }
+        }).then(respuesta => {
+            if (!respuesta.ok) {
+                throw new Error(`HTTP ${respuesta.status}`);
+            }
+            return respuesta.json();
+        });
+    }
+
+    function filaMensaje(texto) {
+        tablaCompras.innerHTML = `
+            <tr>
+                <td colspan="6" class="text-center py-3">
+                    <span class="text-muted">${texto}</span>
+                </td>
+            </tr>
+        `;
+    }
+
+    function seleccionarCompra(radio) {
+        const filaCompra = radio.closest('.compra-mantenimiento-row');
+        const serie = filaCompra.querySelector('.badge').textContent;
+        const producto = filaCompra.querySelectorAll('td')[2].textContent.trim();
+        const usuario = filaCompra.querySelectorAll('td')[3].textContent.trim();
+
+        compraInput.value = radio.value;
+        compraSeleccionadaTexto.innerHTML = `<i class="bi bi-qrcode"></i> ${escaparHtml(serie)} - ${escaparHtml(producto)} (${escaparHtml(usuario)})`;
+        compraSeleccionadaAlert.style.display = 'block';
+        compraSeleccionadaAlert.scrollIntoView({ behavior: 'smooth' });
+
+        console.log('✅ Compra seleccionada:', { serie, producto, usuario });
+    }
+
+    function crearFilaCompra(compra) {
+        const fila = document.createElement('tr');
+        fila.className = 'compra-mantenimiento-row';
+        fila.style.cursor = 'pointer';
+        fila.style.transition = 'background-color 0.2s';
+        const marcada = String(compra.id) === compraInput.value ? 'checked' : '';
+        fila.innerHTML = `
+            <td class="text-center">
+                <div class="form-check">
+                    <input class="form-check-input radio-compra" type="radio" name="compra"
+                           id="compra${compra.id}" value="${compra.id}" ${marcada}>
+                </div>
+            </td>
+            <td>
+                <span class="badge bg-info">${escaparHtml(compra.numero_serie || 'Sin serie')}</span>
+            </td>
+            <td>
+                <strong>${escaparHtml(compra.nombre || 'N/A')}</strong>
+            </td>
+            <td>
+                <i class="bi bi-person-circle text-success"></i>
+                ${escaparHtml(compra.usuario_nombre || 'No asignado')}
+            </td>
+            <td>
+                <i class="bi bi-geo-alt-fill text-warning"></i>
+                ${escaparHtml(compra.ubicacion_nombre || 'N/A')}
+            </td>
+            <td>
+                <small class="text-muted">${escaparHtml(compra.fecha_compra || '-')}</small>
+            </td>
+        `;
+
+        // Seleccionar compra con radio button
+        const radio = fila.querySelector('.radio-compra');
+        radio.addEventListener('change', function() {
+            if (this.checked) {
+                seleccionarCompra(this);
+            }
+        });
+
+        // Seleccionar compra con doble clic
+        fila.addEventListener('dblclick', function(e) {
+            e.preventDefault();
+            radio.checked = true;
+            radio.dispatchEvent(new Event('change', { bubbles: true }));
+
+            this.style.backgroundColor = '#d4edda';
+            setTimeout(() => {
+                this.style.backgroundColor = '';
+            }, 300);
+
+            console.log('⚡ Doble clic en fila - seleccionada');
+        });
+
+        fila.addEventListener('mouseenter', function() {
+            this.style.backgroundColor = '#f8f9fa';
+        });
+
+        fila.addEventListener('mouseleave', function() {
+            if (!radio.checked) {
+                this.style.backgroundColor = '';
+            }
+        });
+
+        return fila;
+    }
+
+    // Fila "Mostrar más" al final de la tabla cuando hay otra página
+    function agregarFilaMas(cargarMas) {
+        const fila = document.createElement('tr');
+        fila.className = 'fila-mostrar-mas';
+        fila.innerHTML = `
+            <td colspan="6" class="text-center">
+                <button type="button" class="btn btn-sm btn-outline-secondary">
+                    <i class="bi bi-chevron-down"></i> Mostrar más
+                </button>
+            </td>
+        `;
+        fila.querySelector('button').addEventListener('click', function(e) {
+            e.preventDefault();
+            this.disabled = true;
+            cargarMas();
+        });
+        tablaCompras.appendChild(fila);
+    }
+
+    function filtrarCompras(offset = 0) {
+        const busqueda = ++busquedaCompras;
+        const parametros = {
+            ubicacion: filterUbicacionCompra.value,
+            usuario: filterUsuarioCompra.value,
+            q: searchCompra.value.trim(),
+            offset: offset
+        };
+
+        console.log('🔍 Filtrando compras:', parametros);
+
+        buscarCompras(parametros).then(datos => {
+            if (busqueda !== busquedaCompras) return;
+            if (offset === 0) {
+                tablaCompras.innerHTML = '';
+            }
+            tablaCompras.querySelectorAll('.fila-mostrar-mas').forEach(fila => fila.remove());
+
+            datos.items.forEach(compra => tablaCompras.appendChild(crearFilaCompra(compra)));
+            if (offset === 0 && datos.items.length === 0) {
+                filaMensaje('No hay compras disponibles');
+            }
+            if (datos.has_more) {
+                agregarFilaMas(() => filtrarCompras(offset + datos.items.length));
+            }
+
+            const visibles = tablaCompras.querySelectorAll('.compra-mantenimiento-row').length;
+            comprasEncontradas.textContent = visibles + (datos.has_more ? '+' : '');
+            console.log('✅ Compras mostradas:', visibles);
+        }).catch(error => {
+            console.error('❌ Error buscando compras:', error);
+            if (busqueda === busquedaCompras && offset === 0) {
+                filaMensaje('No se pudieron cargar las compras');
+            }
+        });
+    }
+
+    // Event listeners para filtros
+    filterUbicacionCompra.addEventListener('change', function() {
+        console.log('📍 Ubicación cambió a:', this.value);
+        filtrarCompras();
+    });
+
+    filterUsuarioCompra.addEventListener('change', function() {
+        console.log('👤 Usuario cambió a:', this.value);
+        filtrarCompras();
+    });
+
+    searchCompra.addEventListener('input', conRetraso(function() {
+        console.log('🔎 Búsqueda:', this.value);
+        filtrarCompras();
+    }));
+
+    // Primera página
+    filtrarCompras();
+});
@@ -0,0 +1,508 @@
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('✅ Script de relaciones cargado');
+
+    // Datos que arma el servidor (bloque datos-pagina de relaciones.html)
+    const datosPagina = JSON.parse(document.getElementById('datos-pagina').textContent);
+
+    // ========== ELEMENTOS DEL DOM ==========
+    const filtroUbicacionMadre = document.getElementById('filtroUbicacionMadre');
+    const filtroUsuarioMadre = document.getElementById('filtroUsuarioMadre');
+    const searchMadre = document.getElementById('searchMadre');
+    const searchHijo = document.getElementById('searchHijo');
+    const tablaComprasMadreBody = document.getElementById('tablaComprasMadre');
+    const tablaComprasHijoBody = document.getElementById('tablaComprasHijo');
+    const infoMadreAlert = document.getElementById('infoMadreAlert');
+    const infoMadreTexto = document.getElementById('infoMadreTexto');
+    const infoHijoAlert = document.getElementById('infoHijoAlert');
+    const infoHijoTexto = document.getElementById('infoHijoTexto');
+    const divSubCompras = document.getElementById('divSubCompras');
+    const botonesAccion = document.getElementById('botonesAccion');
+    const btnCrearRelacion = document.getElementById('btnCrearRelacion');
+    const btnLimpiar = document.getElementById('btnLimpiar');
+    const inputMadre = document.getElementById('id_compra_madre');
+    const inputHijo = document.getElementById('id_sub_compra');
+    const form = document.getElementById('relacionForm');
+    const comprasMadreEncontradas = document.getElementById('comprasMadreEncontradas');
+    const comprasHijoEncontradas = document.getElementById('comprasHijoEncontradas');
+
+    let madreSeleccionada = null;
+    let hijoSeleccionado = null;
+
+    function escaparHtml(texto) {
+        const div = document.createElement('div');
+        div.textContent = texto == null ? '' : String(texto);
+        return div.innerHTML;
+    }
+
+    // ========== BÚSQUEDAS EN EL SERVIDOR ==========
+    // Las tablas de compras madre y sub compras piden sus filas a
+    // /buscar/<catalogo> de a una página; la página no incluye las compras
+    const URL_BUSCAR = datosPagina.urlBuscar;
+    // Solo se pinta la respuesta de la última búsqueda de cada tabla
+    let busquedaMadre = 0;
+    let busquedaHijo = 0;
+
+    function buscarCatalogo(catalogo, parametros = {}) {
+        const query = new URLSearchParams();
+        Object.entries(parametros).forEach(([clave, valor]) => {
+            if (valor !== '' && valor !== null && valor !== undefined) {
+                query.set(clave, valor);
+            }
+        });
+        return fetch(URL_BUSCAR.replace('CATALOGO', catalogo) + '?' + query.toString(), {
+            headers: { 'Accept': 'application/json' }
+        }).then(respuesta => {
+            if (!respuesta.ok) {
+                throw new Error(`HTTP ${respuesta.status}`);
+            }
+            return respuesta.json();
+        });
+    }
+
+    // Esperar a que el usuario deje de escribir antes de consultar
+    function conRetraso(funcion, espera = 250) {
+        let temporizador = null;
+        return function(...args) {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(() => funcion.apply(this, args), espera);
+        };
+    }
+
+    function filaMensaje(tbody, texto) {
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="6" class="text-center py-3">
+                    <span class="text-muted">${texto}</span>
+                </td>
+            </tr>
+        `;
+    }
+
+    // Fila "Mostrar más" al final de la tabla cuando hay otra página
+    function agregarFilaMas(tbody, cargarMas) {
+        const fila = document.createElement('tr');
+        fila.className = 'fila-mostrar-mas';
+        fila.innerHTML = `
+            <td colspan="6" class="text-center">
+                <button type="button" class="btn btn-sm btn-outline-secondary">
+                    <i class="bi bi-chevron-down"></i> Mostrar más
+                </button>
+            </td>
+        `;
+        fila.querySelector('button').addEventListener('click', function(e) {
+            e.preventDefault();
+            this.disabled = true;
+            cargarMas();
+        });
+        tbody.appendChild(fila);
+    }
+
+    // Fila de una compra: doble clic selecciona, hover resalta
+    function crearFilaCompra(compra, claseFila, claseRadio, claseBadge) {
+        const fila = document.createElement('tr');
+        fila.className = claseFila;
+        fila.setAttribute('data-id', compra.id);
+        fila.setAttribute('data-usuario-id', compra.usuario_id);
+        fila.setAttribute('data-nombre', compra.nombre || 'N/A');
+        fila.setAttribute('data-serie', compra.numero_serie || '');
+        fila.setAttribute('data-usuario-nombre', compra.usuario_nombre);
+        fila.setAttribute('data-ubicacion-nombre', compra.ubicacion_nombre || '');
+        fila.style.cursor = 'pointer';
+        fila.style.transition = 'background-color 0.2s';
+
+        fila.innerHTML = `
+            <td class="text-center">
+                <div class="form-check">
+                    <input class="form-check-input ${claseRadio}" type="radio" name="${claseRadio}" value="${compra.id}">
+                </div>
+            </td>
+            <td><strong>${escaparHtml(compra.nombre || 'N/A')}</strong></td>
+            <td><span class="badge ${claseBadge}">${escaparHtml(compra.numero_serie || 'Sin serie')}</span></td>
+            <td><i class="bi bi-person-circle text-success"></i> ${escaparHtml(compra.usuario_nombre)}</td>
+            <td><i class="bi bi-geo-alt-fill text-warning"></i> ${escaparHtml(compra.ubicacion_nombre || 'N/A')}</td>
+            <td><small class="text-muted">${escaparHtml(compra.fecha_compra || '-')}</small></td>
+        `;
+
+        const radio = fila.querySelector('.' + claseRadio);
+
+        // Doble clic
+        fila.addEventListener('dblclick', function(e) {
+            e.preventDefault();
+            radio.checked = true;
+            radio.dispatchEvent(new Event('change', { bubbles: true }));
+            fila.style.backgroundColor = '#d4edda';
+            setTimeout(() => {
+                fila.style.backgroundColor = '';
+            }, 300);
+        });
+
+        // Hover
+        fila.addEventListener('mouseenter', function() {
+            fila.style.backgroundColor = '#f8f9fa';
+        });
+
+        fila.addEventListener('mouseleave', function() {
+            if (!radio.checked) {
+                fila.style.backgroundColor = '';
+            }
+        });
+
+        return fila;
+    }
+
+    // Pintar una página de resultados en una tabla de compras
+    function pintarCompras(tbody, contador, datos, offset, crearFila, cargarMas, sinResultados) {
+        if (offset === 0) {
+            tbody.innerHTML = '';
+        }
+        tbody.querySelectorAll('.fila-mostrar-mas').forEach(fila => fila.remove());
+
+        datos.items.forEach(compra => tbody.appendChild(crearFila(compra)));
+        if (offset === 0 && datos.items.length === 0) {
+            filaMensaje(tbody, sinResultados);
+        }
+        if (datos.has_more) {
+            agregarFilaMas(tbody, () => cargarMas(offset + datos.items.length));
+        }
+
+        const mostradas = offset + datos.items.length;
+        contador.textContent = mostradas + (datos.has_more ? '+' : '');
+    }
+
+    // ========== ACTUALIZAR USUARIOS POR UBICACIÓN ==========
+    function actualizarUsuarios() {
+        const ubicacionId = filtroUbicacionMadre.value;
+        filtroUsuarioMadre.innerHTML = '<option value="">👤 Todos los usuarios</option>';
+        filtroUsuarioMadre.disabled = !ubicacionId;
+
+        if (ubicacionId) {
+            buscarCatalogo('usuarios', { ubicacion: ubicacionId, limit: 100 }).then(datos => {
+                if (filtroUbicacionMadre.value !== ubicacionId) return;
+                datos.items.forEach(usuario => {
+                    const option = document.createElement('option');
+                    option.value = usuario.id;
+                    option.textContent = usuario.nombre;
+                    filtroUsuarioMadre.appendChild(option);
+                });
+                if (datos.has_more) {
+                    const option = document.createElement('option');
+                    option.disabled = true;
+                    option.textContent = '… más usuarios: usa la búsqueda';
+                    filtroUsuarioMadre.appendChild(option);
+                }
+            }).catch(error => {
+                console.error('❌ Error cargando usuarios:', error);
+            });
+        }
+
+        actualizarTablaComprasMadre();
+    }
+
+    // ========== ACTUALIZAR TABLA COMPRAS MADRE ==========
+    function seleccionarMadre() {
+        if (!this.checked) return;
+        const fila = this.closest('.compra-madre-row');
+        madreSeleccionada = {
+            id: fila.getAttribute('data-id'),
+            nombre: fila.getAttribute('data-nombre'),
+            serie: fila.getAttribute('data-serie'),
+            usuario_id: fila.getAttribute('data-usuario-id'),
+            usuario_nombre: fila.getAttribute('data-usuario-nombre'),
+            ubicacion_nombre: fila.getAttribute('data-ubicacion-nombre')
+        };
+
+        inputMadre.value = madreSeleccionada.id;
+        infoMadreTexto.innerHTML = `
+            <i class="bi bi-pc-display"></i> ${escaparHtml(madreSeleccionada.nombre)} 
+            ${madreSeleccionada.serie ? `(${escaparHtml(madreSeleccionada.serie)})` : ''} 
+            - 👤 ${escaparHtml(madreSeleccionada.usuario_nombre)}
+        `;
+        infoMadreAlert.style.display = 'block';
+        divSubCompras.style.display = 'block';
+        botonesAccion.style.display = 'flex';
+
+        // Limpiar hijo
+        hijoSeleccionado = null;
+        inputHijo.value = '';
+        infoHijoAlert.style.display = 'none';
+        btnCrearRelacion.disabled = true;
+
+        // Llenar tabla de hijos
+        actualizarTablaComprasHijo();
+    }
+
+    function crearFilaMadre(compra) {
+        const fila = crearFilaCompra(compra, 'compra-madre-row', 'radio-madre', 'bg-info');
+        fila.querySelector('.radio-madre').addEventListener('change', seleccionarMadre);
+        return fila;
+    }
+
+    function actualizarTablaComprasMadre(offset = 0) {
+        const busqueda = ++busquedaMadre;
+        buscarCatalogo('compras_madre', {
+            ubicacion: filtroUbicacionMadre.value,
+            usuario: filtroUsuarioMadre.value,
+            q: searchMadre.value.trim(),
+            offset: offset
+        }).then(datos => {
+            if (busqueda !== busquedaMadre) return;
+            pintarCompras(tablaComprasMadreBody, comprasMadreEncontradas, datos, offset,
+                          crearFilaMadre, actualizarTablaComprasMadre, 'No hay compras madre disponibles');
+        }).catch(error => {
+            console.error('❌ Error buscando compras madre:', error);
+            if (busqueda === busquedaMadre && offset === 0) {
+                filaMensaje(tablaComprasMadreBody, 'No se pudieron cargar las compras madre');
+            }
+        });
+    }
+
+    // ========== ACTUALIZAR TABLA COMPRAS HIJO ==========
+    function seleccionarHijo() {
+        if (!this.checked) return;
+        const fila = this.closest('.compra-hijo-row');
+        hijoSeleccionado = {
+            id: fila.getAttribute('data-id'),
+            nombre: fila.getAttribute('data-nombre'),
+            serie: fila.getAttribute('data-serie')
+        };
+
+        inputHijo.value = hijoSeleccionado.id;
+        infoHijoTexto.innerHTML = `
+            <i class="bi bi-box"></i> ${escaparHtml(hijoSeleccionado.nombre)} 
+            ${hijoSeleccionado.serie ? `(${escaparHtml(hijoSeleccionado.serie)})` : ''}
+        `;
+        infoHijoAlert.style.display = 'block';
+        btnCrearRelacion.disabled = false;
+
+        console.log('✅ Relación lista para crear');
+    }
+
+    function crearFilaHijo(compra) {
+        const fila = crearFilaCompra(compra, 'compra-hijo-row', 'radio-hijo', 'bg-warning text-dark');
+        fila.querySelector('.radio-hijo').addEventListener('change', seleccionarHijo);
+        return fila;
+    }
+
+    function actualizarTablaComprasHijo(offset = 0) {
+        const busqueda = ++busquedaHijo;
+        if (!madreSeleccionada) {
+            filaMensaje(tablaComprasHijoBody, 'Selecciona primero una compra madre');
+            return;
+        }
+
+        buscarCatalogo('compras_sub', {
+            usuario: madreSeleccionada.usuario_id,
+            madre: madreSeleccionada.id,
+            q: searchHijo.value.trim(),
+            offset: offset
+        }).then(datos => {
+            if (busqueda !== busquedaHijo) return;
+            pintarCompras(tablaComprasHijoBody, comprasHijoEncontradas, datos, offset,
+                          crearFilaHijo, actualizarTablaComprasHijo, 'No hay componentes disponibles para este usuario');
+        }).catch(error => {
+            console.error('❌ Error buscando sub compras:', error);
+            if (busqueda === busquedaHijo && offset === 0) {
+                filaMensaje(tablaComprasHijoBody, 'No se pudieron cargar los componentes');
+            }
+        });
+    }
+
+    // ========== EVENT LISTENERS ==========
+    filtroUbicacionMadre.addEventListener('change', actualizarUsuarios);
+    filtroUsuarioMadre.addEventListener('change', () => actualizarTablaComprasMadre());
+    searchMadre.addEventListener('input', conRetraso(() => actualizarTablaComprasMadre()));
+    searchHijo.addEventListener('input', conRetraso(() => actualizarTablaComprasHijo()));
+
+    btnLimpiar.addEventListener('click', function(e) {
+        e.preventDefault();
+        filtroUbicacionMadre.value = '';
+        filtroUsuarioMadre.value = '';
+        searchMadre.value = '';
+        searchHijo.value = '';
+        madreSeleccionada = null;
+        hijoSeleccionado = null;
+        inputMadre.value = '';
+        inputHijo.value = '';
+        infoMadreAlert.style.display = 'none';
+        infoHijoAlert.style.display = 'none';
+        divSubCompras.style.display = 'none';
+        botonesAccion.style.display = 'none';
+        btnCrearRelacion.disabled = true;
+        console.log('🔄 Selecciones limpias');
+        actualizarTablaComprasMadre();
+    });
+
+    // Primera página de compras madre
+    actualizarTablaComprasMadre();
+
+    btnCrearRelacion.addEventListener('click', function(e) {
+        e.preventDefault();
+        if (inputMadre.value && inputHijo.value) {
+            form.submit();
+        }
+    });
+
+    // ========== FILTRADO DE TABLA DE RELACIONES ==========
+    const filterUbicacion = document.getElementById('filterUbicacion');
+    const filterUsuario = document.getElementById('filterUsuario');
+    const filterProducto = document.getElementById('filterProducto');
+    const filterSerie = document.getElementById('filterSerie');
+    const tablaRelacionesList = document.getElementById('tablaRelacionesList');
+    const filasRelaciones = tablaRelacionesList ? tablaRelacionesList.getElementsByClassName('relacion-row') : [];
+    const contadorFiltradas = document.getElementById('relacionesFiltradas');
+
+    function filtrarTabla() {
+        const ubicacionFiltro = filterUbicacion.value.toLowerCase();
+        const usuarioFiltro = filterUsuario.value.toLowerCase();
+        const productoFiltro = filterProducto.value.toLowerCase();
+        const serieFiltro = filterSerie.value.toLowerCase();
+
+        let totalFiltradas = 0;
+
+        Array.from(filasRelaciones).forEach(fila => {
+            const ubicacion = (fila.getAttribute('data-ubicacion') || '').toLowerCase();
+            const usuario = (fila.getAttribute('data-usuario') || '').toLowerCase();
+            const producto = (fila.getAttribute('data-producto') || '').toLowerCase();
+            const serie = (fila.getAttribute('data-serie') || '').toLowerCase();
+
+            const mostrar = 
+                (ubicacionFiltro === '' || ubicacion.includes(ubicacionFiltro)) &&
+                (usuarioFiltro === '' || usuario.includes(usuarioFiltro)) &&
+                (productoFiltro === '' || producto.includes(productoFiltro)) &&
+                (serieFiltro === '' || serie.includes(serieFiltro));
+
+            fila.style.display = mostrar ? '' : 'none';
+            if (mostrar) totalFiltradas++;
+        });
+
+        contadorFiltradas.textContent = totalFiltradas;
+    }
+
+    filterUbicacion.addEventListener('change', filtrarTabla);
+    filterUsuario.addEventListener('change', filtrarTabla);
+    filterProducto.addEventListener('keyup', filtrarTabla);
+    filterSerie.addEventListener('keyup', filtrarTabla);
+
+    document.getElementById('resetFilters').addEventListener('click', function(e) {
+        e.preventDefault();
+        filterUbicacion.value = '';
+        filterUsuario.value = '';
+        filterProducto.value = '';
+        filterSerie.value = '';
+        Array.from(filasRelaciones).forEach(fila => {
+            fila.style.display = '';
+        });
+        contadorFiltradas.textContent = filasRelaciones.length;
+    });
+
+    filtrarTabla();
+
+    // ========== MODAL DE DETALLES ==========
+    window.verDetalles = function(id) {
+        const relaciones = datosPagina.relaciones;
+        const relacion = relaciones.find(rel => rel.id === id);
+
+        if (relacion) {
+            const modalBody = document.getElementById('modalDetallesBody');
+            modalBody.innerHTML = `
+                <div class="row mb-3">
+                    <div class="col-md-6">
+                        <div class="card">
+                            <div class="card-header bg-light">
+                                <h6 class="mb-0">
+                                    <i class="bi bi-pc-display"></i> Compra Madre
+                                </h6>
+                            </div>
+                            <div class="card-body">
+                                <p><strong>${relacion.producto_madre_nombre}</strong></p>
+                                <p class="text-muted">ID: ${relacion.compra_madre_id}</p>
+                                <p>Series: <span class="badge bg-info">${relacion.serie_madre || 'Sin serie'}</span></p>
+                                <p>👤 ${relacion.usuario_madre_nombre || 'Sin usuario'}</p>
+                                <p><i class="bi bi-geo-alt"></i> ${relacion.ubicacion_madre || 'Sin ubicación'}</p>
+                            </div>
+                        </div>
+                    </div>
+                    <div class="col-md-6">
+                        <div class="card">
+                            <div class="card-header bg-light">
+                                <h6 class="mb-0">
+                                    <i class="bi bi-box"></i> Sub Compra
+                                </h6>
+                            </div>
+                            <div class="card-body">
+                                <p><strong>${relacion.producto_hija_nombre}</strong></p>
+                                <p class="text-muted">ID: ${relacion.sub_compra_id}</p>
+                                <p>Series: <span class="badge bg-warning text-dark">${relacion.serie_hija || 'Sin serie'}</span></p>
+                                <p>👤 ${relacion.usuario_hija_nombre || 'Sin usuario'}</p>
+                                <p><i class="bi bi-geo-alt"></i> ${relacion.ubicacion_hija || 'Sin ubicación'}</p>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+                <div class="card">
+                    <div class="card-header bg-light">
+                        <h6 class="mb-0">
+                            <i class="bi bi-diagram-3"></i> Ensamble completo
+                        </h6>
+                    </div>
+                    <div class="card-body" id="arbolEnsamble">
+                        <span class="text-muted">Cargando...</span>
+                    </div>
+                </div>
+            `;
+
+            const modal = new bootstrap.Modal(document.getElementById('detallesModal'));
+            modal.show();
+            cargarEnsamble(relacion.compra_madre_id);
+        }
+    };
+
+    // ========== ÁRBOL DEL ENSAMBLE ==========
+    // Se sube hasta la raíz del ensamble de la compra madre y se muestra todo
+    // lo que cuelga de ella, a cualquier profundidad
+    const URL_RAIZ = datosPagina.urlRaiz;
+    const URL_SUBARBOL = datosPagina.urlSubarbol;
+
+    function urlCompra(plantilla, id) {
+        return plantilla.replace(/\/0\//, '/' + encodeURIComponent(id) + '/');
+    }
+
+    function nodoHtml(nodo, resaltar) {
+        const icono = nodo.es_madre ? 'bi-pc-display' : 'bi-box';
+        const clase = nodo.id === resaltar ? ' fw-bold text-primary' : '';
+        const hijos = nodo.hijos.length
+            ? '<ul class="list-unstyled ms-4 mb-0">' + nodo.hijos.map(h => nodoHtml(h, resaltar)).join('') + '</ul>'
+            : '';
+        return `
+            <li class="py-1">
+                <span class="${clase}"><i class="bi ${icono}"></i> ${escaparHtml(nodo.producto_nombre)}</span>
+                <span class="badge bg-secondary">${escaparHtml(nodo.numero_serie || 'Sin serie')}</span>
+                <small class="text-muted">ID: ${nodo.id}</small>
+                ${hijos}
+            </li>`;
+    }
+
+    async function cargarEnsamble(idMadre) {
+        const contenedor = document.getElementById('arbolEnsamble');
+        try {
+            const respRaiz = await fetch(urlCompra(URL_RAIZ, idMadre));
+            if (!respRaiz.ok) throw new Error(respRaiz.status);
+            const raiz = await respRaiz.json();
+
+            const respArbol = await fetch(urlCompra(URL_SUBARBOL, raiz.raices[0].id));
+            if (!respArbol.ok) throw new Error(respArbol.status);
+            const subarbol = await respArbol.json();
+
+            let html = '<ul class="list-unstyled mb-0">' + nodoHtml(subarbol.arbol, Number(idMadre)) + '</ul>';
+            if (raiz.raices.length > 1) {
+                html += `<small class="text-muted">La compra también forma parte de otros ${raiz.raices.length - 1} ensamble(s)</small>`;
+            }
+            contenedor.innerHTML = html;
+        } catch (error) {
+            console.error('❌ Error cargando el ensamble:', error);
+            contenedor.innerHTML = '<span class="text-danger">No se pudo cargar el ensamble</span>';
+        }
+    }
+
+    console.log('✅ Script completamente inicializado');
+});
@@ -0,0 +1,80 @@
+# ========== COSTO TOTAL DE PROPIEDAD (TCO) ==========
+# El reporte lee Resumen_TCO (una fila por compra) y Resumen_TCO_Grupos
+# (totales por producto y por usuario), ver init-db.sql. Los triggers anotan
+# en TCO_Pendientes las compras que cambiaron y REFRESCAR_SQL las recalcula al
+# final de cada transacción de escritura: el costo de cada escritura depende
+# de lo que cambió, no del historial completo, y las vistas solo leen.
+#
+# Costo de una compra: su precio (o el estándar del producto si no lo tiene)
+# más el de sus componentes directos. En los grupos solo se suma el precio de
+# cada compra, porque los componentes ya son compras del mismo usuario.
+
+DEFAULT_AGRUPAR = 'producto'
+
+# agrupar -> (JOIN con el catálogo, nombre, nombre del grupo 0)
+AGRUPACIONES_TCO = {
+    'producto': ("LEFT JOIN Productos x ON x.IdProducto = g.Grupo",
+                 "x.Nombre", "Sin producto"),
+    'usuario': ("LEFT JOIN Usuarios x ON x.IdUsuario = g.Grupo",
+                "x.Nombre", "Sin usuario"),
+}
+
+# Además de los grupos, el listado puede mostrar las compras una por una
+VISTAS_TCO = ('compra',) + tuple(AGRUPACIONES_TCO)
+
+# Espera a un refresco en curso de otra transacción: al confirmar no puede
+# quedar ninguna compra propia sin aplicar al resumen
+REFRESCAR_SQL = "SELECT refrescar_resumen_tco(TRUE) as compras"
+
+# Los totales por producto cubren todas las compras (las sin producto van al grupo 0)
+TOTALES_SQL = """
+    SELECT COALESCE(sum(Compras), 0)::BIGINT as compras,
+           COALESCE(sum(Precio), 0) as precio,
+           COALESCE(sum(Mantenimientos), 0)::BIGINT as mantenimientos,
+           COALESCE(sum(Mantenimientos_Abiertos), 0)::BIGINT as mantenimientos_abiertos,
+           COALESCE(sum(Dias_Mantenimiento), 0)::BIGINT as dias_mantenimiento
+    FROM Resumen_TCO_Grupos
+    WHERE Agrupacion = 'producto'
+"""
+
+COMPRAS_TCO_SELECT = """
+    SELECT r.Compra as id,
+           ac.NumeroSerie as numero_serie,
+           ac.Fecha_Compra as fecha_compra,
+           r.Producto as producto_id,
+           p.Nombre as producto_nombre,
+           r.Usuario as usuario_id,
+           u.Nombre as usuario_nombre,
+           r.Precio as precio,
+           r.Precio_Estimado as precio_estimado,
+           r.Mantenimientos as mantenimientos,
+           r.Mantenimientos_Abiertos as mantenimientos_abiertos,
+           r.Dias_Mantenimiento as dias_mantenimiento,
+           r.Componentes as componentes,
+           r.Precio_Componentes as precio_componentes,
+           r.Costo_Total as costo_total
+    FROM Resumen_TCO r
+    JOIN AsignadorCompra ac ON ac.IdAsignadorCompra = r.Compra
+    LEFT JOIN Productos p ON p.IdProducto = ac.Producto
+    LEFT JOIN Usuarios u ON u.IdUsuario = ac.Comprado_Para
+"""
+
+
+def parse_agrupar(valor):
+    return valor if valor in VISTAS_TCO else DEFAULT_AGRUPAR
+
+
+def grupos_sql(agrupar):
+    """Consulta base de los grupos de una agrupación (sin WHERE ni ORDER BY)"""
+    join, nombre, sin_grupo = AGRUPACIONES_TCO[agrupar]
+    return f"""
+    SELECT g.Grupo as id,
+           COALESCE({nombre}, '{sin_grupo}') as nombre,
+           g.Compras as compras,
+           g.Precio as precio,
+           g.Mantenimientos as mantenimientos,
+           g.Mantenimientos_Abiertos as mantenimientos_abiertos,
+           g.Dias_Mantenimiento as dias_mantenimiento
+    FROM Resumen_TCO_Grupos g
+    {join}
+    """